@@ -0,0 +1,171 @@
+import json
+
+from bisect import bisect_left
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+# arXiv假期列表（美国东部时间）, 假期当天(美东)不发布, 因此会推迟次日UTC+0 00:00的更新
+# 来源: https://info.arxiv.org/help/availability.html , 新的年份可以用`load_holidays`从json文件加载
+HOLIDAYS = {
+    2024: [
+        "2024 15 January",
+        "2024 22 May",
+        "2024 19 June",
+        "2024 4 July",
+        "2024 2 September",
+        "2024 28 November",
+        "2024 25 December",
+        "2024 26 December",
+        "2024 31 December",
+    ],
+    2025: [
+        "2025 1 January",
+        "2025 20 January",
+        "2025 19 June",
+        "2025 4 July",
+        "2025 1 September",
+        "2025 27 November",
+        "2025 25 December",
+        "2025 26 December",
+        "2025 31 December",
+    ],
+    2026: [
+        "2026 1 January",
+        "2026 19 January",
+        "2026 19 June",
+        "2026 3 July",
+        "2026 7 September",
+        "2026 26 November",
+        "2026 25 December",
+    ],
+}
+
+# datetime64[D]以1970-01-01为0
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def parse_holiday(holiday: str | date) -> date:
+    if isinstance(holiday, date):
+        return holiday
+    for fmt in ("%Y %d %B", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(holiday, fmt).date()
+        except ValueError:
+            pass
+    raise ValueError(f"Unrecognized holiday: {holiday}")
+
+
+def load_holidays(path) -> dict[int, list[date]]:
+    """
+    从json文件加载假期表, 格式为 {"2027": ["2027-01-01", "2027 18 January", ...], ...}
+    """
+    with open(path, encoding="utf-8") as f:
+        return {int(year): [parse_holiday(d) for d in days] for year, days in json.load(f).items()}
+
+
+class ArxivCalendar:
+    """
+    预先计算好的arXiv公布日历。
+
+    公布日(UTC+0 00:00)为周一到周五, 且前一天(美东)不是假期。
+    日历把[year_from, year_until]内的所有公布日保存为有序的序数数组, "下一个公布日"用二分查找得到;
+    查询超出范围时会自动扩展年份范围
+    """
+
+    def __init__(self, year_from=2000, year_until=None, holidays=None):
+        """
+        Args:
+            year_from (int, optional): 起始年份. Defaults to 2000.
+            year_until (int | None, optional): 结束年份(含), None表示明年. Defaults to None.
+            holidays (dict[int, list[str | date]] | None, optional): 各年份的假期表. Defaults to HOLIDAYS.
+        """
+        holidays = HOLIDAYS if holidays is None else holidays
+        self.holidays = {parse_holiday(d) for days in holidays.values() for d in days}
+        self.year_from = year_from
+        self.year_until = year_until if year_until is not None else date.today().year + 1
+        self.days = self._build(self.year_from, self.year_until)
+
+    def _build(self, year_from, year_until) -> list[int]:
+        day = date(year_from, 1, 1)
+        last = date(year_until, 12, 31)
+        days = []
+        while day <= last:
+            if day.weekday() < 5 and day - timedelta(days=1) not in self.holidays:
+                days.append(day.toordinal())
+            day += timedelta(days=1)
+        return days
+
+    def _extend(self, year):
+        if year < self.year_from:
+            self.days = self._build(year, self.year_from - 1) + self.days
+            self.year_from = year
+        elif year >= self.year_until:
+            # 多扩展一年, 保证查询年末时仍能找到下一年的第一个公布日
+            self.days = self.days + self._build(self.year_until + 1, year + 1)
+            self.year_until = year + 1
+
+    def is_update_day(self, day: date) -> bool:
+        ordinal = day.toordinal()
+        i = bisect_left(self.days, ordinal)
+        return i < len(self.days) and self.days[i] == ordinal
+
+    def next_update_day(self, time: datetime) -> datetime:
+        """
+        计算arXiv下一次更新的时间
+        Args:
+            time: 当前时间
+        Returns:
+            datetime: 下一次arXiv更新的时间(UTC+0 00:00), 若`time`恰好是公布日的00:00则返回它本身
+        """
+        day = time.date()
+        if time > datetime.combine(day, datetime.min.time(), tzinfo=time.tzinfo):
+            day += timedelta(days=1)
+        if not self.year_from <= day.year < self.year_until:
+            self._extend(day.year)
+        ordinal = self.days[bisect_left(self.days, day.toordinal())]
+        return datetime.combine(date.fromordinal(ordinal), datetime.min.time(), tzinfo=time.tzinfo)
+
+    def next_update_days(self, days: np.ndarray) -> np.ndarray:
+        """
+        `next_update_day`的向量化版本, 用于批量处理整个数据库
+
+        Args:
+            days (np.ndarray): datetime64[D]数组, 每个元素表示当天的00:00
+        Returns:
+            np.ndarray: datetime64[D]数组, 每个日期当天或之后的第一个公布日
+        """
+        days = np.asarray(days, dtype="datetime64[D]")
+        if days.size == 0:
+            return days
+        for day in (days.min().astype(object), days.max().astype(object)):
+            if not self.year_from <= day.year < self.year_until:
+                self._extend(day.year)
+        update_days = np.array(self.days, dtype=np.int64) - EPOCH_ORDINAL
+        index = np.searchsorted(update_days, days.astype(np.int64))
+        return update_days[index].astype("datetime64[D]")
+
+
+_default_calendar: ArxivCalendar | None = None
+
+
+def default_calendar() -> ArxivCalendar:
+    global _default_calendar
+    if _default_calendar is None:
+        _default_calendar = ArxivCalendar()
+    return _default_calendar
+
+
+def set_default_calendar(calendar: ArxivCalendar):
+    """
+    替换`next_arxiv_update_day`等使用的默认日历, 例如加载了新年份假期表的日历
+    """
+    global _default_calendar
+    _default_calendar = calendar
+
+
+if __name__ == "__main__":
+    calendar = default_calendar()
+    print(f"{len(calendar.days)} update days in {calendar.year_from}-{calendar.year_until}")
+    print(calendar.next_update_day(datetime.now()))
+    print(calendar.next_update_day(datetime.strptime("2024 9 3", "%Y %m %d")))
@@ -1,15 +1,24 @@
 import asyncio
-import re
 import ftplib
+import hashlib
+import os
 
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta, UTC
 from itertools import chain
 import aiohttp
-from bs4 import BeautifulSoup, NavigableString, Tag
 from rich.console import Console
 from rich.progress import Progress, SpinnerColumn, TimeElapsedColumn
-from arxiv_time import next_arxiv_update_day
-from paper import Paper, PaperDatabase, PaperExporter, FTPClient
+from arxiv_calendar import HOLIDAYS, ArxivCalendar, load_holidays, set_default_calendar
+from arxiv_time import AnnouncedDateTracker, infer_announced_dates, next_arxiv_update_day
+from page_cache import PageCache
+from paper import AsyncPaperDatabase, Paper, PaperDatabase, PaperExporter, FTPClient, translate_papers
+from rate_limiter import THROTTLE_STATUS, FetchFailure, RateController, backoff_delay, parse_retry_after
+from search_parser import get_parser, parse_search_ids, parse_search_page
+from shard_planner import SEARCH_RESULT_LIMIT, SearchShard, split_by_keywords, split_shard
+from translation_cache import set_default_cache_path
 
 
 class ArxivScraper(object):
@@ -22,6 +31,16 @@ class ArxivScraper(object):
         optional_keywords=["LLM", "LLMs", "language model", "language models", "multimodal", "finetuning", "GPT"],
         trans_to="zh-CN",
         proxy=None,
+        max_concurrency=8,
+        limit_per_host=8,
+        requests_per_second=2.0,
+        max_retries=4,
+        parser="auto",
+        parse_workers=0,
+        prefetch_pages=3,
+        cache_dir=None,
+        cache_ttl=7 * 24 * 3600,
+        offline=False,
     ):
         """
         一个抓取指定日期范围内的arxiv文章的类,
@@ -39,6 +58,17 @@ class ArxivScraper(object):
                 Defaults to [ "LLM", "LLMs", "language model", "language models", "multimodal", "finetuning", "GPT"]
             trans_to: 翻译的目标语言, 若设为可转换为False的值则不会翻译
             proxy (str | None, optional): 用于翻译和爬取arxiv时要使用的代理, 通常是http://127.0.0.1:7890. Defaults to None
+            max_concurrency (int, optional): 同时在途的搜索页面请求数上限, 实际并发数会在此范围内自适应调整. Defaults to 8.
+            limit_per_host (int, optional): 共享会话中每个主机的连接数上限. Defaults to 8.
+            requests_per_second (float, optional): 令牌桶限制的平均请求速率. Defaults to 2.0.
+            max_retries (int, optional): 单个页面失败后的最大重试次数. Defaults to 4.
+            parser (str, optional): 搜索页面的解析后端, "lxml", "bs4"或"auto"(有lxml时使用lxml). Defaults to "auto".
+            parse_workers (int, optional): 解析页面的进程数, 为0时在事件循环中直接解析, 为-1时使用`os.cpu_count()`个进程,
+                以便在大规模爬取时让网络I/O与解析重叠. Defaults to 0.
+            prefetch_pages (int, optional): 增量更新时预先并发请求的页面数. Defaults to 3.
+            cache_dir (str | None, optional): 搜索页面的压缩缓存目录, 为None时不缓存. Defaults to None.
+            cache_ttl (float | None, optional): 缓存有效秒数. Defaults to 7天.
+            offline (bool, optional): 离线重放模式, 只从缓存读取页面(忽略过期时间), 不访问网络. Defaults to False.
         """
         # announced_date_first 日期处理为年月，从from到until的所有月份都会被爬取
         # 如果from和until是同一个月，则until设置为下个月(from+31)
@@ -55,14 +85,31 @@ class ArxivScraper(object):
 
         self.trans_to = trans_to  # translate
         self.proxy = proxy
+        self.limit_per_host = limit_per_host  # session_scope
+        self.max_retries = max_retries  # request
+        self.session: aiohttp.ClientSession | None = None  # session_scope
+        self.rate_controller = RateController(
+            requests_per_second=requests_per_second, burst=max_concurrency, max_concurrency=max_concurrency
+        )  # request
+        self.failures: list[FetchFailure] = []  # fetch_all, update
+        self.parser = get_parser(parser)  # parse_search_html, parse_page
+        self.parse_workers = (os.cpu_count() or 1) if parse_workers < 0 else parse_workers  # session_scope
+        self.parse_pool: ProcessPoolExecutor | None = None  # session_scope, parse_page
+        self.prefetch_pages = max(1, prefetch_pages)  # update_all
+        if offline and not cache_dir:
+            raise ValueError("Offline mode requires cache_dir.")
+        self.page_cache = PageCache(cache_dir, ttl=cache_ttl) if cache_dir else None  # request
+        self.offline = offline  # request
 
         self.filt_date_by = "announced_date_first"  # url
         self.order = "-announced_date_first"  # url(结果默认按首次公布日期的降序排列，这样最新公布的会在前面)
         self.total = None  # fetch_all
         self.step = 50  # url, fetch_all
+        self.scan_step = 200  # url, update_by_scan(arxiv搜索允许的最大每页条数)
         self.papers: list[Paper] = []  # fetch_all
 
         self.paper_db = PaperDatabase()
+        self.async_db = AsyncPaperDatabase(self.paper_db)  # 在异步流程中不阻塞事件循环地访问数据库
         self.paper_exporter = PaperExporter(date_from, date_until, category_blacklist, category_whitelist)
         self.console = Console()
 
@@ -73,94 +120,499 @@ class ArxivScraper(object):
         """
         return dict(repo_url="https://github.com/DCoEngine/PCoCrawler", **self.__dict__)
 
-    def get_url(self, start):
+    def get_url(self, start, shard: SearchShard | None = None, scan=False):
         """
         获取用于搜索的url
 
         Args:
             start (int): 返回结果的起始序号, 每个页面只会包含序号为[start, start+50)的文章
-            filter_date_by (str, optional): 日期筛选方式. Defaults to "submitted_date_first".
+            shard (SearchShard | None, optional): 子查询, 指定时使用其中的月份范围和关键词. Defaults to None.
+            scan (bool, optional): 扫描页面, 隐藏摘要并使用最大的每页条数(`scan_step`), 只用来提取url. Defaults to False.
         """
         # https://arxiv.org/search/advanced?terms-0-operator=AND&terms-0-term=LLM&terms-0-field=all&terms-1-operator=OR&terms-1-term=language+model&terms-1-field=all&terms-2-operator=OR&terms-2-term=multimodal&terms-2-field=all&terms-3-operator=OR&terms-3-term=finetuning&terms-3-field=all&terms-4-operator=AND&terms-4-term=GPT&terms-4-field=all&classification-computer_science=y&classification-physics_archives=all&classification-include_cross_list=include&date-year=&date-filter_by=date_range&date-from_date=2024-08-08&date-to_date=2024-08-15&date-date_type=submitted_date_first&abstracts=show&size=50&order=submitted_date
+        keywords = shard.keywords if shard else self.optional_keywords
         kwargs = "".join(
             f"&terms-{i}-operator=OR&terms-{i}-term={kw}&terms-{i}-field=all"
-            for i, kw in enumerate(self.optional_keywords)
+            for i, kw in enumerate(keywords)
         )
-        date_from = self.search_from_date.strftime("%Y-%m")
-        date_until = self.search_until_date.strftime("%Y-%m")
+        if shard:
+            date_from = shard.month_from.strftime("%Y-%m")
+            date_until = shard.month_until.strftime("%Y-%m")
+        else:
+            date_from = self.search_from_date.strftime("%Y-%m")
+            date_until = self.search_until_date.strftime("%Y-%m")
         return (
             f"https://arxiv.org/search/advanced?advanced={kwargs}"
             f"&classification-computer_science=y&classification-physics_archives=all&"
             f"classification-include_cross_list=include&"
             f"date-year=&date-filter_by=date_range&date-from_date={date_from}&date-to_date={date_until}&"
-            f"date-date_type={self.filt_date_by}&abstracts=show&size={self.step}&order={self.order}&start={start}"
+            f"date-date_type={self.filt_date_by}&abstracts={'hide' if scan else 'show'}&"
+            f"size={self.scan_step if scan else self.step}&order={self.order}&start={start}"
         )
-    async def request(self, start):
+
+    @asynccontextmanager
+    async def session_scope(self):
+        """
+        在整个爬取过程中复用同一个aiohttp会话(keep-alive连接池)。
+        嵌套调用会直接复用已有会话, 只有最外层的调用者负责关闭它, 同时关闭`async_db`的数据库线程
         """
-        异步请求网页，重试至多3次
+        if self.session is not None and not self.session.closed:
+            yield self.session
+            return
+        connector = aiohttp.TCPConnector(limit_per_host=self.limit_per_host, keepalive_timeout=60)
+        self.session = aiohttp.ClientSession(
+            connector=connector, trust_env=True, timeout=aiohttp.ClientTimeout(sock_read=180)
+        )
+        if self.parse_workers:
+            self.parse_pool = ProcessPoolExecutor(max_workers=self.parse_workers)
+        try:
+            yield self.session
+        finally:
+            await self.session.close()
+            self.session = None
+            if self.parse_pool is not None:
+                self.parse_pool.shutdown(cancel_futures=True)
+                self.parse_pool = None
+            self.async_db.close()
+
+    async def request(self, start, shard: SearchShard | None = None, scan=False, use_cache=True):
+        """
+        异步请求网页。请求经过`rate_controller`限速, 失败后按指数退避(带抖动)重试至多`max_retries`次,
+        遇到429/503时遵循`Retry-After`并降低并发。
+        设置了`cache_dir`时优先读取缓存, 并缓存成功的响应; 离线模式下缓存未命中直接返回失败记录
+
+        Args:
+            use_cache (bool, optional): 是否读取缓存. 增量更新的url按月查询, 整个月内都不变,
+                缓存中的旧页面会漏掉新公布的文章, 因此更新时应设为False(离线模式下仍然读取缓存). Defaults to True.
+
+        Returns:
+            str | FetchFailure: 网页内容, 或者最终仍然失败时的失败记录
         """
-        error = 0
-        url = self.get_url(start)
-        while error <= 3:
+        url = self.get_url(start, shard, scan)
+        if self.page_cache is not None and (use_cache or self.offline):
+            content = self.page_cache.get(url, allow_expired=self.offline)
+            if content is not None:
+                return content
+            if self.offline:
+                return FetchFailure(start=start, url=url, status=None, error="not in page cache", attempts=0)
+
+        status, error = None, ""
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
             try:
-                async with aiohttp.ClientSession(trust_env=True, read_timeout=180) as session:
+                async with self.session_scope() as session, self.rate_controller:
                     async with session.get(url, proxy=self.proxy) as response:
-                        response.raise_for_status()
-                        content = await response.text()
-                        return content
+                        status = response.status
+                        if status in THROTTLE_STATUS:
+                            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                            self.rate_controller.on_throttle(retry_after)
+                            error = f"throttled with HTTP {status}"
+                        else:
+                            response.raise_for_status()
+                            content = await response.text()
+                            self.rate_controller.on_success()
+                            if self.page_cache is not None:
+                                self.page_cache.put(url, content)
+                            return content
             except Exception as e:
-                error += 1
-                self.console.log(f"[bold red]Request {start} cause error: ")
-                self.console.print_exception()
-                self.console.log(f"[bold red]Retrying {start}... {error}/3")
+                status = getattr(e, "status", None)
+                error = f"{type(e).__name__}: {getattr(e, 'message', e)}"
+            if attempt < self.max_retries:
+                delay = retry_after if retry_after is not None else backoff_delay(attempt)
+                self.console.log(
+                    f"[bold red]Request {start} failed ({error}), "
+                    f"retrying in {delay:.1f}s... {attempt + 1}/{self.max_retries}"
+                )
+                await asyncio.sleep(delay)
+        self.console.log(f"[bold red]Request {start} failed after {self.max_retries + 1} attempts: {error}")
+        return FetchFailure(start=start, url=url, status=status, error=error, attempts=self.max_retries + 1)
 
-    async def fetch_all(self):
+    def close(self):
         """
-        (aio)获取所有文章
+        关闭数据库线程和数据库连接
         """
-        # 获取前50篇文章并记录总数
-        self.console.log(f"[bold green]Fetching the first {self.step} papers...")
-        self.console.print(f"[grey] {self.get_url(0)}")
-        content = await self.request(0)
-        self.papers.extend(self.parse_search_html(content))
+        self.async_db.close()
+        self.paper_db.close()
 
-        # 获取剩余的内容
-        with Progress(
-            SpinnerColumn(),
-            *Progress.get_default_columns(),
-            TimeElapsedColumn(),
-            console=self.console,
-            transient=False,
-        ) as p:  # rich进度条
-            task = p.add_task(
-                description=f"[bold green]Fetching {self.total} results",
-                total=self.total,
-            )
-            p.update(task, advance=self.step)
+    def parse_failure(self, start, error: Exception, shard: SearchShard | None = None) -> FetchFailure:
+        """
+        把页面的解析错误记录为失败的请求
+        """
+        self.console.log(f"[bold red]Failed to parse page {start}: {error}")
+        return FetchFailure(
+            start=start, url=self.get_url(start, shard), status=None, error=f"{type(error).__name__}: {error}", attempts=1
+        )
 
-            async def wrapper(start):  # wrapper用于显示进度
-                # 异步请求网页，并解析其中的内容
-                content = await self.request(start)
-                papers = self.parse_search_html(content)
+    def crawl_fingerprint(self, shard: SearchShard | None = None) -> str:
+        """
+        当前搜索(或其子查询)的指纹, 用于在数据库中记录和恢复爬取进度
+        """
+        return hashlib.sha256(self.get_url(0, shard).encode()).hexdigest()
+
+    async def save_page(self, fingerprint: str, start: int, papers: list[Paper] | None, error: str | None = None):
+        """
+        (aio)记录一个页面的结果。页面中的文章按页面内的顺序临时推断首次公布日期后立即写入数据库,
+        全部页面完成后再统一推断; `papers`为None表示该页面失败
+        """
+        if papers is not None:
+            AnnouncedDateTracker(self.fisrt_announced_date).feed(reversed(papers))
+        await self.async_db.run(self.paper_db.save_crawl_page, fingerprint, start, papers, error)
+
+    async def fetch_all(self, resume=False):
+        """
+        (aio)获取所有文章
+        每个页面完成后其中的文章立即写入数据库, 并记录该页面已完成; 中断后可以用`resume=True`跳过已完成的页面,
+        只重新请求缺失或失败的页面
+
+        Args:
+            resume (bool, optional): 是否从同一搜索上一次未完成的进度继续. Defaults to False.
+        """
+        fingerprint = self.crawl_fingerprint()
+        unfinished = await self.async_db.run(self.paper_db.unfinished_crawl_job, fingerprint) if resume else None
+        done: set[int] = set()
+        if unfinished:
+            self.total, done = unfinished
+            self.console.log(f"[bold yellow]Resuming crawl {fingerprint[:8]}, {len(done)} pages already completed.")
+
+        async with self.session_scope():
+            if 0 not in done:
+                # 获取前50篇文章并记录总数
+                self.console.log(f"[bold green]Fetching the first {self.step} papers...")
+                self.console.print(f"[grey] {self.get_url(0)}")
+                content = await self.request(0)
+                if isinstance(content, FetchFailure):
+                    self.failures.append(content)
+                    self.console.log(f"[bold red]Failed to fetch the first page, abort.")
+                    return
+                first_page = await self.parse_page(content)
+                if self.total > SEARCH_RESULT_LIMIT:
+                    # arxiv只能翻到前SEARCH_RESULT_LIMIT条结果, 拆分为多个子查询才能拿到全部结果
+                    self.console.log(
+                        f"[bold yellow]{self.total} results exceed the pagination limit {SEARCH_RESULT_LIMIT}, "
+                        f"sharding the query..."
+                    )
+                    await self.fetch_sharded(resume=resume)
+                    return
+                if not unfinished:
+                    if resume:
+                        self.console.log(f"[bold yellow]No unfinished crawl to resume, starting over.")
+                    await self.async_db.run(self.paper_db.start_crawl_job, fingerprint, self.get_url(0), self.total)
+                self.papers.extend(first_page)
+                await self.save_page(fingerprint, 0, first_page)
+
+            # 获取剩余的内容
+            with Progress(
+                SpinnerColumn(),
+                *Progress.get_default_columns(),
+                TimeElapsedColumn(),
+                console=self.console,
+                transient=False,
+            ) as p:  # rich进度条
+                task = p.add_task(
+                    description=f"[bold green]Fetching {self.total} results",
+                    total=self.total,
+                )
                 p.update(task, advance=self.step)
-                return papers
 
-            # 创建异步任务
-            fetch_tasks = []
-            for start in range(self.step, self.total, self.step):
-                fetch_tasks.append(wrapper(start))
-            papers_list = await asyncio.gather(*fetch_tasks)
-            self.papers.extend(chain(*papers_list))
+                async def wrapper(start):  # wrapper用于显示进度
+                    papers = []
+                    if start not in done:
+                        # 异步请求网页，并解析其中的内容, 然后记录进度
+                        content = await self.request(start)
+                        if isinstance(content, FetchFailure):
+                            self.failures.append(content)
+                            await self.save_page(fingerprint, start, None, content.error)
+                        else:
+                            papers = await self.parse_page(content)
+                            await self.save_page(fingerprint, start, papers)
+                    p.update(task, advance=self.step)
+                    return papers
+
+                # 创建异步任务
+                fetch_tasks = []
+                for start in range(self.step, self.total, self.step):
+                    fetch_tasks.append(wrapper(start))
+                papers_list = await asyncio.gather(*fetch_tasks)
+                self.papers.extend(chain(*papers_list))
 
         self.console.log(f"[bold green]Fetching completed. ")
+        if self.failures:
+            self.console.log(
+                f"[bold red]{len(self.failures)} pages failed: "
+                + ", ".join(str(failure.start) for failure in self.failures)
+                + ". Run again with resume=True (--resume) to retry them."
+            )
+        else:
+            await self.async_db.run(self.paper_db.finish_crawl_job, fingerprint)
         #if self.trans_to:
         #    await self.translate()
-        self.process_papers()
+        if unfinished:
+            # 之前完成的页面已经在数据库中, 不在self.papers里, 从数据库重新推断这次搜索范围内的首次公布日期
+            self.reinfer_announced_dates(next_arxiv_update_day(self.fisrt_announced_date))
+        else:
+            self.process_papers()
+
+    async def probe_shards(self, shards: list[SearchShard]) -> list[tuple[SearchShard, int, list[Paper]] | None]:
+        """
+        (aio)并发请求每个子查询的第一页, 得到其结果总数和第一页文章; 失败的子查询为None
+        """
+        probed = []
+        for shard, content in zip(shards, await asyncio.gather(*(self.request(0, shard) for shard in shards))):
+            if isinstance(content, FetchFailure):
+                self.failures.append(content)
+                self.console.log(f"[bold red]Failed to probe shard {shard}, skipped.")
+                probed.append(None)
+            else:
+                probed.append((shard, *await self.parse_page_with_total(content)))
+        return probed
 
-    def fetch_update(self):
+    async def plan_shards(self) -> list[tuple[SearchShard, int, list[Paper]]]:
+        """
+        (aio)规划子查询: 用第一页表头中的结果总数探测每个子查询的大小,
+        超过SEARCH_RESULT_LIMIT的子查询先按月份、再按关键词拆分, 直到每个子查询都能完整翻页。
+        按月份拆分后, 若各部分的结果总数之和与原查询不一致(部分文章可能被漏掉或重复), 改为按关键词拆分
+
+        Returns:
+            list[tuple[SearchShard, int, list[Paper]]]: 子查询, 其结果总数, 以及探测时得到的第一页文章
+        """
+        root = SearchShard.from_months(self.search_from_date, self.search_until_date, self.optional_keywords)
+        (probed,) = await self.probe_shards([root])
+        return await self.plan_shard(probed) if probed is not None else []
+
+    async def plan_shard(self, probed: tuple[SearchShard, int, list[Paper]]) -> list[tuple[SearchShard, int, list[Paper]]]:
+        shard, total, first_page = probed
+        if total <= SEARCH_RESULT_LIMIT:
+            return [probed]
+        children = split_shard(shard)
+        if not children:
+            self.console.log(
+                f"[bold red]Shard {shard} has {total} results and cannot be split further, "
+                f"only the first {SEARCH_RESULT_LIMIT} will be fetched."
+            )
+            return [probed]
+        children_probed = await self.probe_shards(children)
+        if children[0].keywords == shard.keywords and None not in children_probed:
+            children_total = sum(child_total for _, child_total, _ in children_probed)
+            if children_total != total:
+                if keyword_children := split_by_keywords(shard):
+                    self.console.log(
+                        f"[bold yellow]Splitting {shard} by month gives {children_total} results instead of {total}, "
+                        f"splitting by keywords instead."
+                    )
+                    children_probed = await self.probe_shards(keyword_children)
+                else:
+                    self.console.log(
+                        f"[bold red]Splitting {shard} by month gives {children_total} results instead of {total}, "
+                        f"some papers may be missing."
+                    )
+        planned = await asyncio.gather(
+            *(self.plan_shard(child) for child in children_probed if child is not None)
+        )
+        return list(chain(*planned))
+
+    async def fetch_sharded(self, resume=False):
+        """
+        (aio)把搜索拆分为多个子查询并行获取, 合并结果并按url去重, 用于结果总数超过arxiv翻页上限的搜索。
+        每个子查询以自己的指纹记录爬取进度, 全部页面成功后才一起标记完成
+
+        Args:
+            resume (bool, optional): 是否从各子查询上一次未完成的进度继续. Defaults to False.
+        """
+        fingerprints = []
+        resumed = False
+        async with self.session_scope():
+            shards = await self.plan_shards()
+            total = sum(min(shard_total, SEARCH_RESULT_LIMIT) for _, shard_total, _ in shards)
+            self.console.log(f"[bold green]Planned {len(shards)} shards with {total} results in total.")
+
+            with Progress(
+                SpinnerColumn(),
+                *Progress.get_default_columns(),
+                TimeElapsedColumn(),
+                console=self.console,
+                transient=False,
+            ) as p:
+                task = p.add_task(description=f"[bold green]Fetching {total} results", total=total)
+
+                async def fetch_page(fingerprint, shard, start):
+                    content = await self.request(start, shard)
+                    p.update(task, advance=self.step)
+                    if isinstance(content, FetchFailure):
+                        self.failures.append(content)
+                        await self.save_page(fingerprint, start, None, content.error)
+                        return []
+                    try:
+                        _, papers = await self.parse_page_with_total(content)
+                    except ValueError as e:
+                        failure = self.parse_failure(start, e, shard)
+                        self.failures.append(failure)
+                        await self.save_page(fingerprint, start, None, failure.error)
+                        return []
+                    await self.save_page(fingerprint, start, papers)
+                    return papers
+
+                async def fetch_shard(shard, shard_total, first_page):
+                    nonlocal resumed
+                    fingerprint = self.crawl_fingerprint(shard)
+                    fingerprints.append(fingerprint)
+                    unfinished = (
+                        await self.async_db.run(self.paper_db.unfinished_crawl_job, fingerprint) if resume else None
+                    )
+                    done = unfinished[1] if unfinished else set()
+                    if unfinished:
+                        resumed = True
+                    else:
+                        await self.async_db.run(
+                            self.paper_db.start_crawl_job, fingerprint, self.get_url(0, shard), shard_total
+                        )
+                    if 0 in done:
+                        first_page = []
+                    else:
+                        await self.save_page(fingerprint, 0, first_page)
+                    starts = range(self.step, min(shard_total, SEARCH_RESULT_LIMIT), self.step)
+                    p.update(task, advance=self.step * (1 + sum(start in done for start in starts)))
+                    pages = await asyncio.gather(
+                        *(fetch_page(fingerprint, shard, start) for start in starts if start not in done)
+                    )
+                    return list(chain(first_page, *pages))
+
+                results = await asyncio.gather(*(fetch_shard(*planned) for planned in shards))
+
+        # 合并: 月份范围越新越靠前; 同一月份范围内按关键词拆分的子查询之间没有公布顺序, 按提交日期排序
+        groups = defaultdict(list)
+        for (shard, _, _), papers in zip(shards, results):
+            groups[(shard.month_from, shard.month_until)].append(papers)
+        seen = set()
+        for date_range in sorted(groups, reverse=True):
+            papers = groups[date_range]
+            if len(papers) == 1:
+                merged = papers[0]
+            else:
+                merged = sorted(chain(*papers), key=lambda paper: paper.first_submitted_date, reverse=True)
+            for paper in merged:
+                if paper.url not in seen:
+                    seen.add(paper.url)
+                    self.papers.append(paper)
+        self.total = len(self.papers)
+
+        self.console.log(f"[bold green]Fetching completed. {self.total} unique papers.")
+        if self.failures:
+            self.console.log(
+                f"[bold red]{len(self.failures)} pages failed: "
+                + ", ".join(str(failure.start) for failure in self.failures)
+                + ". Run again with resume=True (--resume) to retry them."
+            )
+        else:
+            for fingerprint in fingerprints:
+                await self.async_db.run(self.paper_db.finish_crawl_job, fingerprint)
+        if resumed:
+            self.reinfer_announced_dates(next_arxiv_update_day(self.fisrt_announced_date))
+        else:
+            self.process_papers()
+
+    async def fetch_stream(self, batch_size=500):
+        """
+        (aio)流式获取所有文章, 适合结果很多的爬取。
+        页面从最旧的一页开始按顺序获取并解析, 经由队列交给存储阶段; 存储阶段增量推断首次公布日期,
+        并分批写入数据库。内存占用只取决于并发数和`batch_size`, 与结果总数无关, 中途崩溃也不会丢失已写入的批次。
+        与`fetch_all`不同, 文章不会保存在`self.papers`中
+
+        Args:
+            batch_size (int, optional): 每批写入数据库的文章数. Defaults to 500.
+
+        Returns:
+            int: 写入数据库的文章数
+        """
+        async with self.session_scope():
+            self.console.log(f"[bold green]Fetching the first {self.step} papers...")
+            self.console.print(f"[grey] {self.get_url(0)}")
+            content = await self.request(0)
+            if isinstance(content, FetchFailure):
+                self.failures.append(content)
+                self.console.log(f"[bold red]Failed to fetch the first page, abort.")
+                return 0
+            first_page = await self.parse_page(content)
+
+            # 结果按首次公布日期降序排列, 从最后一页往前获取, 存储阶段才能按从旧到新的顺序推断日期
+            window = 2 * self.rate_controller.max_concurrency
+            pages: asyncio.Queue[list[Paper] | None] = asyncio.Queue(maxsize=window)
+
+            async def fetch_page(start):
+                content = await self.request(start)
+                if isinstance(content, FetchFailure):
+                    self.failures.append(content)
+                    return []
+                try:
+                    return await self.parse_page(content)
+                except ValueError as e:
+                    # 维护页面等无法解析的页面与请求失败一样跳过, 记录在失败列表中以便重试
+                    self.failures.append(self.parse_failure(start, e))
+                    return []
+
+            async def produce():
+                # 窗口内的页面并发获取, 但按顺序放入队列
+                in_flight = deque()
+                try:
+                    for start in reversed(range(self.step, self.total, self.step)):
+                        in_flight.append(asyncio.create_task(fetch_page(start)))
+                        if len(in_flight) >= window:
+                            await pages.put(await in_flight.popleft())
+                    while in_flight:
+                        await pages.put(await in_flight.popleft())
+                    await pages.put(first_page)
+                    await pages.put(None)
+                except Exception:
+                    # 通知存储阶段结束, 异常在`await producer`时重新抛出
+                    await pages.put(None)
+                    raise
+                finally:
+                    for fetch_task in in_flight:
+                        fetch_task.cancel()
+
+            with Progress(
+                SpinnerColumn(),
+                *Progress.get_default_columns(),
+                TimeElapsedColumn(),
+                console=self.console,
+                transient=False,
+            ) as p:
+                task = p.add_task(description=f"[bold green]Streaming {self.total} results", total=self.total)
+                tracker = AnnouncedDateTracker(self.fisrt_announced_date)
+                producer = asyncio.create_task(produce())
+                stored = 0
+                batch: list[Paper] = []
+                try:
+                    while (papers := await pages.get()) is not None:
+                        tracker.feed(reversed(papers))
+                        batch.extend(papers)
+                        if len(batch) >= batch_size:
+                            await self.async_db.add_papers(batch)
+                            stored += len(batch)
+                            batch = []
+                        p.update(task, advance=self.step)
+                    if batch:
+                        await self.async_db.add_papers(batch)
+                        stored += len(batch)
+                    await producer
+                finally:
+                    producer.cancel()
+
+        self.console.log(f"[bold green]Streaming completed. {stored} papers stored.")
+        if self.failures:
+            self.console.log(
+                f"[bold red]{len(self.failures)} pages failed: "
+                + ", ".join(str(failure.start) for failure in self.failures)
+            )
+        return stored
+
+    def fetch_update(self, scan=False):
         """
         更新文章, 这会从最新公布的文章开始更新, 直到遇到已经爬取过的文章为止。
         为了效率，建议在运行fetch_all后再运行fetch_update
+
+        Args:
+            scan (bool, optional): 先用隐藏摘要的大页面只扫描url找到新旧文章的分界, 再只获取新文章的详细信息.
+                Defaults to False.
         """
         # 当前时间
         utc_now = datetime.now(UTC).replace(tzinfo=None)
@@ -189,48 +641,134 @@ class ArxivScraper(object):
             )
         self.console.print(f"[grey] {self.get_url(0)}")
 
-        continue_update = self.update(0)
-        for start in range(self.step, self.total, self.step):
-            if not continue_update:
-                break
-
-            continue_update = self.update(start)
-        self.console.log(f"[bold green]Fetching completed. {len(self.papers)} new papers.")
-        if self.trans_to:
-            asyncio.run(self.translate())
+        asyncio.run(self.update_by_scan() if scan else self.update_all())
         self.process_papers()
 
+    async def update_by_scan(self):
+        """
+        (aio)两阶段增量更新: 先按`scan_step`条一页扫描url, 直到遇到已爬取过的文章,
+        再只请求覆盖这些新文章的详细页面, 并在同一个会话中完成翻译
+        """
+        async with self.session_scope():
+            cnt_new, start = 0, 0
+            while True:
+                content = await self.request(start, scan=True, use_cache=False)
+                if isinstance(content, FetchFailure):
+                    # 无法确定分界, 只更新已经确认的新文章
+                    self.failures.append(content)
+                    break
+                self.total, urls = parse_search_ids(content)
+                cnt_page = await self.async_db.count_new_urls(urls)
+                cnt_new += cnt_page
+                start += self.scan_step
+                if cnt_page < len(urls) or start >= self.total:
+                    break
+            self.console.log(f"[bold green]Scan completed. {cnt_new} new papers of {self.total}.")
+
+            pages = await asyncio.gather(
+                *(self.request(start, use_cache=False) for start in range(0, cnt_new, self.step))
+            )
+            for page in pages:
+                if isinstance(page, FetchFailure):
+                    # 之后的页面无法与之前的页面衔接, 丢弃它们, 下次更新时重新获取
+                    self.failures.append(page)
+                    break
+                self.papers.extend(await self.parse_page(page))
+            self.papers = self.papers[:cnt_new]
+            self.console.log(f"[bold green]Fetching completed. {len(self.papers)} new papers.")
+            if self.trans_to:
+                await self.translate()
+
+    async def update_all(self):
+        """
+        (aio)获取新文章直到遇到已爬取过的文章, 并在同一个会话中完成翻译。
+        在按顺序检查每一页的同时, 预先并发请求之后的`prefetch_pages`页, 找到新旧文章的分界后取消多余的请求
+        """
+        async with self.session_scope():
+            continue_update = await self.update(0)
+            starts = iter(range(self.step, self.total or 0, self.step))
+            prefetched: deque[tuple[int, asyncio.Task]] = deque()
+
+            def prefetch():
+                for start in starts:
+                    prefetched.append((start, asyncio.create_task(self.request(start, use_cache=False))))
+                    if len(prefetched) >= self.prefetch_pages:
+                        break
+
+            try:
+                if continue_update:
+                    prefetch()
+                while continue_update and prefetched:
+                    start, fetch_task = prefetched.popleft()
+                    content = await fetch_task
+                    prefetch()
+                    continue_update = await self.apply_update(start, content)
+            finally:
+                for _, fetch_task in prefetched:
+                    fetch_task.cancel()
+                await asyncio.gather(*(fetch_task for _, fetch_task in prefetched), return_exceptions=True)
+            self.console.log(f"[bold green]Fetching completed. {len(self.papers)} new papers.")
+            if self.trans_to:
+                await self.translate()
+
     def process_papers(self):
         """
         推断文章的首次公布日期, 并将文章添加到数据库中
         """
-        # 从下一个可能的公布日期开始
-        announced_date = next_arxiv_update_day(self.fisrt_announced_date)   
-        self.console.log(f"fisrt announced date: {announced_date.strftime('%Y-%m-%d')}")
+        tracker = AnnouncedDateTracker(self.fisrt_announced_date)
+        self.console.log(f"fisrt announced date: {tracker.announced_date.strftime('%Y-%m-%d')}")
         # 按照从前到后的时间顺序梳理文章
-        for paper in reversed(self.papers):
-            # 文章于T日美东时间14:00(T UTC+0 18:00)前提交，将于T日美东时间20:00(T+1 UTC+0 00:00)公布，T始终为工作日。
-            # 因此可知美东 T日的文章至少在UTC+0 T+1日公布，如果超过14:00甚至会在UTC+0 T+2日公布
-            next_possible_annouced_date = next_arxiv_update_day(paper.first_submitted_date + timedelta(days=1))
-            if announced_date < next_possible_annouced_date:
-                announced_date = next_possible_annouced_date
-            paper.first_announced_date = announced_date
-        self.paper_db.add_papers(self.papers)
+        tracker.feed(reversed(self.papers))
+        counts = self.paper_db.add_papers(self.papers)
+        self.console.log(
+            f"[bold green]{counts.inserted} papers inserted, {counts.updated} updated, {counts.unchanged} unchanged."
+        )
     
+    def reinfer_announced_dates(self, announced_from: datetime | None = None, log_file=None) -> tuple[int, int]:
+        """
+        从数据库中分批读取文章的日期, 从`fisrt_announced_date`开始批量重新推断首次公布日期, 只写回有变化的行
+
+        Args:
+            announced_from (datetime | None, optional): 只处理首次公布日期不早于该日期的文章. Defaults to None.
+            log_file (TextIO | None, optional): 逐行写入推断结果的调试文件. Defaults to None.
+
+        Returns:
+            tuple[int, int]: 处理的文章数, 以及首次公布日期有变化的文章数
+        """
+        announced_date = self.fisrt_announced_date
+        n_papers = n_changed = 0
+        for urls, titles, submitted_dates, announced_dates in self.paper_db.iter_date_columns(
+            announced_from=announced_from
+        ):
+            inferred_dates = infer_announced_dates(submitted_dates, announced_date)
+            changed = inferred_dates != announced_dates
+            self.paper_db.update_announced_dates(urls[changed], inferred_dates[changed])
+            # 下一批从这一批的最后一个公布日期继续
+            announced_date = inferred_dates[-1].astype("datetime64[us]").astype(datetime)
+            n_papers += len(urls)
+            n_changed += changed.sum()
+            if log_file is not None:
+                log_file.writelines(
+                    f"{url},{title},{announced},{submitted}\n"
+                    for url, title, announced, submitted in zip(
+                        urls.tolist(),
+                        titles.tolist(),
+                        inferred_dates.astype(str).tolist(),
+                        submitted_dates.astype(str).tolist(),
+                    )
+                )
+        self.console.log(f"[bold green]Reprocessed {n_papers} papers, {n_changed} announced dates changed.")
+        return n_papers, n_changed
+
     def reprocess_papers(self):
         """
-        这会从数据库中获取所有文章, 并重新推断文章的首次公布日期，并打印调试信息
+        这会从数据库中分批读取所有文章的日期, 批量重新推断文章的首次公布日期, 只写回有变化的行, 并打印调试信息
         """
-        self.papers = self.paper_db.fetch_all()
-        self.process_papers()
         with open("announced_date.csv", "w") as f:
             f.write("url,title,announced_date,submitted_date\n")
-            for paper in self.papers:
-                f.write(
-                    f"{paper.url},{paper.title},{paper.first_announced_date.strftime('%Y-%m-%d')},{paper.first_submitted_date.strftime('%Y-%m-%d')}\n"
-                )
+            self.reinfer_announced_dates(log_file=f)
 
-    def update(self, start) -> bool:
+    async def update(self, start) -> bool:
         """
         更新文章列表，从指定起始位置开始获取新文章
         
@@ -240,175 +778,68 @@ class ArxivScraper(object):
         Returns:
             bool: 是否还有更多新文章需要更新
         """
-        content = asyncio.run(self.request(start))
-        self.papers.extend(self.parse_search_html(content))
-        cnt_new = self.paper_db.count_new_papers(self.papers[start : start + self.step])
+        return await self.apply_update(start, await self.request(start, use_cache=False))
+
+    async def apply_update(self, start, content) -> bool:
+        """
+        处理`update`获取到的页面内容, 页面可能是预先请求的
+
+        Args:
+            start (int): 起始位置索引
+            content (str | FetchFailure): 页面内容或者失败记录
+
+        Returns:
+            bool: 是否还有更多新文章需要更新
+        """
+        if isinstance(content, FetchFailure):
+            # 无法确定这一页之后是否还有新文章, 停止更新, 下次更新时会从这里继续
+            self.failures.append(content)
+            return False
+        self.papers.extend(await self.parse_page(content))
+        cnt_new = await self.async_db.count_new_papers(self.papers[start : start + self.step])
         if cnt_new < self.step:
             self.papers = self.papers[: start + cnt_new]
             return False
         else:
             return True
 
-    def parse_search_html(self, content) -> list[Paper]:
+    async def parse_page(self, content) -> list[Paper]:
         """
-        解析搜索结果页面, 并将结果保存到self.paper_result中
+        (aio)解析搜索结果页面。设置了`parse_workers`时在进程池中解析, 事件循环可以继续读取其他页面
         初次调用时, 会解析self.total
-
-        Args:
-            content (str): 网页内容
         """
-
-        """下面是一个搜索结果的例子
-        <li class="arxiv-result">
-            <div class="is-marginless">
-                <p class="list-title is-inline-block">
-                    <a href="https://arxiv.org/abs/physics/9403001">arXiv:physics/9403001</a>
-                    <span>&nbsp;[<a href="https://arxiv.org/pdf/physics/9403001">pdf</a>, <a
-                            href="https://arxiv.org/ps/physics/9403001">ps</a>, <a
-                            href="https://arxiv.org/format/physics/9403001">other</a>]&nbsp;</span>
-                </p>
-                <div class="tags is-inline-block">
-                    <span class="tag is-small is-link tooltip is-tooltip-top" data-tooltip="Popular Physics">
-                        physics.pop-ph</span>
-                    <span class="tag is-small is-grey tooltip is-tooltip-top"
-                        data-tooltip="High Energy Physics - Theory">hep-th</span>
-                </div>
-                <div class="is-inline-block" style="margin-left: 0.5rem">
-                    <div class="tags has-addons">
-                        <span class="tag is-dark is-size-7">doi</span>
-                        <span class="tag is-light is-size-7">
-                            <a class="" href="https://doi.org/10.1063/1.2814991">10.1063/1.2814991 <i
-                                    class="fa fa-external-link" aria-hidden="true"></i></a>
-                        </span>
-                    </div>
-                </div> 
-            </div>
-            <p class="title is-5 mathjax">
-                Desperately Seeking Superstrings
-            </p>
-            <p class="authors">
-                <span class="has-text-black-bis has-text-weight-semibold">Authors:</span>
-                    <a href="/search/?searchtype=author&amp;query=Ginsparg%2C+P">Paul Ginsparg</a>, <a href="/search/?searchtype=author&amp;query=Glashow%2C+S">Sheldon Glashow</a> 
-            </p> 
-            <p class="abstract mathjax">
-                <span class="has-text-black-bis has-text-weight-semibold">Abstract</span>: 
-                
-                <span class="abstract-short has-text-grey-dark mathjax" id="physics/9403001v1-abstract-short"
-                    style="display: inline;"> We provide a detailed analysis of the problems and prospects of superstring theory c.
-                1986, anticipating much of the progress of the decades to follow. </span>
-
-                <span class="abstract-full has-text-grey-dark mathjax" id="physics/9403001v1-abstract-full"
-                    style="display: none;"> We provide a detailed analysis of the problems and prospects of
-                superstring theory c. 1986, anticipating much of the progress of the decades to follow. 
-                <a class="is-size-7" style="white-space: nowrap;"
-                        onclick="document.getElementById('physics/9403001v1-abstract-full').style.display = 'none'; document.getElementById('physics/9403001v1-abstract-short').style.display = 'inline';">△ Less</a>
-                </span>
-            </p> 
-            <p class="is-size-7"><span class="has-text-black-bis has-text-weight-semibold">Submitted</span>
-                25 April, 1986; <span class="has-text-black-bis has-text-weight-semibold">originally
-                announced</span> March 1994. </p> 
-            <p class="comments is-size-7">
-                <span class="has-text-black-bis has-text-weight-semibold">Comments:</span>
-                <span class="has-text-grey-dark mathjax">originally appeared as a Reference Frame in Physics
-                    Today, May 1986</span>
-            </p> 
-            <p class="comments is-size-7">
-                <span class="has-text-black-bis has-text-weight-semibold">Journal ref:</span> Phys.Today
-                86N5 (1986) 7-9 </p> 
-        </li>
-        """
-
-        soup = BeautifulSoup(content, "html.parser")
+        total, papers = await self.parse_page_with_total(content)
         if not self.total:
-            total = soup.select("#main-container > div.level.is-marginless > div.level-left > h1")[0].text
-            # "Showing 1–50 of 2,542,002 results" or "Sorry, your query returned no results"
-            if "Sorry" in total:
-                self.total = 0
-                return []
-            total = int(total[total.find("of") + 3 : total.find("results")].replace(",", ""))
             self.total = total
-
-        results = soup.find_all("li", {"class": "arxiv-result"})
-        papers = []
-        for result in results:
-
-            url_tag = result.find("a")
-            url = url_tag["href"] if url_tag else "No link"
-
-            title_tag = result.find("p", class_="title")
-            title = self.parse_search_text(title_tag) if title_tag else "No title"
-            title = title.strip()
-
-            date_tag = result.find("p", class_="is-size-7")
-            date = date_tag.get_text(strip=True) if date_tag else "No date"
-            if "v1" in date:
-                # Submitted9 August, 2024; v1submitted 8 August, 2024; originally announced August 2024.
-                # 注意空格会被吞掉，这里我们要找最早的提交日期
-                v1 = date.find("v1submitted")
-                date = date[v1 + 12 : date.find(";", v1)]
-            else:
-                # Submitted8 August, 2024; originally announced August 2024.
-                # 注意空格会被吞掉
-                submit_date = date.find("Submitted")
-                date = date[submit_date + 9 : date.find(";", submit_date)]
-
-            category_tag = result.find_all("span", class_="tag")
-            categories = [
-                category.get_text(strip=True) for category in category_tag if "tooltip" in category.get("class")
-            ]
-
-            authors_tag = result.find("p", class_="authors")
-            authors = authors_tag.get_text(strip=True)[len("Authors:") :] if authors_tag else "No authors"
-
-            summary_tag = result.find("span", class_="abstract-full")
-            abstract = self.parse_search_text(summary_tag) if summary_tag else "No summary"
-            abstract = abstract.strip()
-
-            comments_tag = result.find("p", class_="comments")
-            comments = comments_tag.get_text(strip=True)[len("Comments:") :] if comments_tag else "No comments"
-
-            papers.append(
-                Paper(
-                    url=url,
-                    title=title,
-                    first_submitted_date=datetime.strptime(date, "%d %B, %Y"),
-                    categories=categories,
-                    authors=authors,
-                    abstract=abstract,
-                    comments=comments,
-                )
-            )
         return papers
 
-    def parse_search_text(self, tag):
-        """解析搜索结果页面中的文本内容，处理HTML标签和特殊格式
-        
-        处理BeautifulSoup解析的HTML标签，提取纯文本内容，同时处理特殊格式如搜索高亮等。
-        会跳过某些特定类型的标签（如展开/收起控制标签）。
+    async def parse_page_with_total(self, content) -> tuple[int, list[Paper]]:
+        """
+        (aio)解析搜索结果页面, 同时返回页面表头中的结果总数, 不修改self.total
+        """
+        if self.parse_pool is None:
+            total, entries = self.parser.parse(content)
+        else:
+            loop = asyncio.get_running_loop()
+            total, entries = await loop.run_in_executor(self.parse_pool, parse_search_page, content, self.parser.name)
+        return total, self._to_papers(entries)
+
+    def parse_search_html(self, content) -> list[Paper]:
+        """
+        使用`self.parser`解析搜索结果页面, 页面结构见search_parser.py
+        初次调用时, 会解析self.total
 
         Args:
-            tag (bs4.element.Tag): BeautifulSoup解析的HTML标签
-            
-        Returns:
-            str: 处理后的纯文本内容，已去除多余空白字符
-
-        Note:
-            此方法会递归处理标签的子节点，合并文本内容
-        """
-        string = ""
-        for child in tag.children:
-            if isinstance(child, NavigableString):
-                string += re.sub(r"\s+", " ", child)
-            elif isinstance(child, Tag):
-                if child.name == "span" and "search-hit" in child.get("class"):
-                    string += re.sub(r"\s+", " ", child.get_text(strip=False))
-                elif child.name == "a" and ".style.display" in child.get("onclick"):
-                    pass
-                else:
-                    import pdb
+            content (str): 网页内容
+        """
+        total, entries = self.parser.parse(content)
+        if not self.total:
+            self.total = total
+        return self._to_papers(entries)
 
-                    pdb.set_trace()
-        return string
+    @staticmethod
+    def _to_papers(entries) -> list[Paper]:
+        return [Paper(**entry._asdict()) for entry in entries]
 
     async def translate(self):
         if not self.trans_to:
@@ -427,11 +858,17 @@ class ArxivScraper(object):
                 total=total,
             )
 
-            async def worker(paper):
-                await paper.translate(langto=self.trans_to)
-                p.update(task, advance=1)
+            async with self.session_scope() as session:
 
-            await asyncio.gather(*[worker(paper) for paper in self.papers])
+                async def worker(papers):
+                    await translate_papers(papers, langto=self.trans_to, proxy=self.proxy, session=session)
+                    p.update(task, advance=len(papers))
+
+                # 每组文章的标题和摘要打包成少量请求翻译
+                chunk_size = 50
+                await asyncio.gather(
+                    *[worker(self.papers[i : i + chunk_size]) for i in range(0, total, chunk_size)]
+                )
 
     def to_markdown(self, output_dir="./output_llms", filename_format="%Y-%m-%d", meta=False):
         """
@@ -485,7 +922,29 @@ if __name__ == "__main__":
                        help='爬取分类(如cs.CL)')
     parser.add_argument('--keywords', type=str, required=False,
                        help='关键词列表，用逗号分隔(如"LLM,language model")')
+    parser.add_argument('--max-concurrency', type=int, default=8,
+                       help='同时在途的搜索页面请求数上限')
+    parser.add_argument('--stream', action='store_true',
+                       help='流式爬取, 边获取边分批写入数据库')
+    parser.add_argument('--parse-workers', type=int, nargs='?', default=0, const=-1,
+                       help='解析页面的进程数, 0表示在事件循环中解析, 不带值或-1表示按CPU核数')
+    parser.add_argument('--cache-dir', type=str, default=None,
+                       help='搜索页面的压缩缓存目录')
+    parser.add_argument('--offline', action='store_true',
+                       help='离线重放模式, 只使用--cache-dir中缓存的页面重建数据库')
+    parser.add_argument('--resume', action='store_true',
+                       help='从同一搜索上一次未完成的进度继续, 只请求缺失或失败的页面')
+    parser.add_argument('--holidays', type=str, default=None,
+                       help='额外的arXiv假期表(json), 覆盖arxiv_calendar.HOLIDAYS中的同一年份')
+    parser.add_argument('--translation-cache', type=str, default=None,
+                       help='翻译缓存数据库路径, 默认放在papers.db旁边')
     args = parser.parse_args()
+    if args.stream and args.resume:
+        # 流式爬取按顺序分批写入并增量推断公布日期, 没有页面级的断点记录
+        parser.error("--resume cannot be used with --stream")
+
+    if args.holidays:
+        set_default_calendar(ArxivCalendar(holidays={**HOLIDAYS, **load_holidays(args.holidays)}))
 
     # 处理关键词参数
     if args.keywords:
@@ -497,8 +956,22 @@ if __name__ == "__main__":
         date_from=args.date,
         date_until=args.date,
         category_whitelist=[args.category],
-        optional_keywords=keywords
+        optional_keywords=keywords,
+        max_concurrency=args.max_concurrency,
+        parse_workers=args.parse_workers,
+        cache_dir=args.cache_dir,
+        offline=args.offline,
     )          
-    asyncio.run(scraper.fetch_all())
+    set_default_cache_path(
+        args.translation_cache
+        or os.path.join(os.path.dirname(os.path.abspath(scraper.paper_db.db_path)), "translation_cache.db")
+    )
+    try:
+        if args.stream:
+            asyncio.run(scraper.fetch_stream())
+        else:
+            asyncio.run(scraper.fetch_all(resume=args.resume))
 
-    scraper.to_markdown(meta=True)
+        scraper.to_markdown(meta=True)
+    finally:
+        scraper.close()
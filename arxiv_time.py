@@ -1,23 +1,15 @@
-from datetime import UTC, datetime, timedelta
-from functools import lru_cache
-
-# 2024年arXiv假期列表（美国东部时间）
-HOLIDAY_2024 = [
-    "2024 15 January",
-    "2024 22 May",
-    "2024 19 June",
-    "2024 4 July",
-    "2024 2 September",
-    "2024 28 November",
-    "2024 25 December",
-    "2024 26 December",
-    "2024 31 December",
-]
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from arxiv_calendar import HOLIDAYS, default_calendar, parse_holiday
+
+# 2024年arXiv假期列表（美国东部时间）, 各年份的假期表见arxiv_calendar.HOLIDAYS
+HOLIDAY_2024 = HOLIDAYS[2024]
 # 将假期字符串转换为日期对象
-HOLIDAY_2024_date = [datetime.strptime(d, "%Y %d %B").date() for d in HOLIDAY_2024]
+HOLIDAY_2024_date = [parse_holiday(d) for d in HOLIDAY_2024]
 
 
-@lru_cache()
 def next_arxiv_update_day(time: datetime):
     """
     计算arXiv下一次更新的时间
@@ -30,18 +22,55 @@ def next_arxiv_update_day(time: datetime):
         - arXiv更新时间为UTC+0 00:00:00
         - 美国假期会导致更新推迟
         - 周末(周六、周日)不更新
+        - 基于预先计算的`ArxivCalendar`二分查找, 不再需要缓存每个时间点的结果
     """
+    # 假期均为美国东部时间（UTC-4），因此9.2放假会导致9.3 UTC+0的更新推迟
+    # arxiv的更新时间为周日-周四的美东20:00，对应周一到周五的UTC 00:00
+    return default_calendar().next_update_day(time)
 
-    time.astimezone(UTC)
-    time_date = time.replace(hour=0, minute=0, second=0, microsecond=0)
-    if time > time_date:
-        time = time_date + timedelta(days=1)
 
-    # 上述假期均为美国东部时间（UTC-4），因此9.2放假会导致9.3 UTC+0的更新推迟
-    # arxiv的更新时间为周日-周四的美东20:00，对应周一到周五的UTC 00:00
-    while time.date() - timedelta(days=1) in HOLIDAY_2024_date or time.weekday() in [5, 6]:
-        time = time + timedelta(days=1)
-    return time
+class AnnouncedDateTracker:
+    """
+    增量推断文章的首次公布日期。
+
+    arxiv的搜索结果按首次公布日期降序排列, 因此按从旧到新的顺序遍历时, 公布日期单调不减。
+    本类保存遍历到当前位置时的公布日期, 使得推断可以分块进行, 而不需要一次性持有全部文章。
+    """
+
+    def __init__(self, first_announced_date: datetime):
+        # 从下一个可能的公布日期开始
+        self.announced_date = next_arxiv_update_day(first_announced_date)
+
+    def feed(self, papers):
+        """
+        按从旧到新的顺序处理一块文章, 就地设置每篇文章的`first_announced_date`
+
+        Args:
+            papers (Iterable[Paper]): 按时间从前到后排列的文章
+        """
+        for paper in papers:
+            # 文章于T日美东时间14:00(T UTC+0 18:00)前提交，将于T日美东时间20:00(T+1 UTC+0 00:00)公布，T始终为工作日。
+            # 因此可知美东 T日的文章至少在UTC+0 T+1日公布，如果超过14:00甚至会在UTC+0 T+2日公布
+            next_possible_annouced_date = next_arxiv_update_day(paper.first_submitted_date + timedelta(days=1))
+            if self.announced_date < next_possible_annouced_date:
+                self.announced_date = next_possible_annouced_date
+            paper.first_announced_date = self.announced_date
+
+
+def infer_announced_dates(submitted_dates: np.ndarray, first_announced_date: datetime) -> np.ndarray:
+    """
+    `AnnouncedDateTracker`的向量化版本: 一次性推断一组文章的首次公布日期
+
+    Args:
+        submitted_dates (np.ndarray): 按从旧到新排列的首次提交日期, datetime64[D]数组
+        first_announced_date (datetime): 最早的可能公布日期
+    Returns:
+        np.ndarray: 对应的首次公布日期, datetime64[D]数组
+    """
+    start = np.datetime64(next_arxiv_update_day(first_announced_date).date(), "D")
+    # 每篇文章最早在提交次日之后的第一个公布日公布, 且公布日期随顺序单调不减
+    possible_dates = default_calendar().next_update_days(submitted_dates + np.timedelta64(1, "D"))
+    return np.maximum.accumulate(np.maximum(possible_dates, start))
 
 
 if __name__ == "__main__":
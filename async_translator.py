@@ -1,8 +1,24 @@
 import asyncio
+import re
 
 import aiohttp
 import requests
 
+from rate_limiter import RateController
+from translation_cache import default_cache
+
+# 缓存键中的翻译后端名
+BACKEND = "google"
+
+# 批量翻译时每个分段前的编号分隔符, 以及从译文中切分分段的模式(容忍翻译接口在分隔符内插入空白)
+SEGMENT_MARKER = "@@{}@@"
+SEGMENT_PATTERN = re.compile(r"@@\s*(\d+)\s*@@")
+
+# 批量翻译共享的限速器, 所有`async_translate_batch`调用(包括逐条退回的请求)合计不超过这个并发数和速率
+TRANSLATE_RATE_CONTROLLER = RateController(
+    requests_per_second=5.0, burst=4, initial_concurrency=4, max_concurrency=4
+)
+
 
 class TranslateTask:
     """翻译任务数据类
@@ -90,64 +106,190 @@ def TL(a):
     return str(a) + jd + str(int(a) ^ int(b))
 
 
-async def async_google_translate(data, url="https://translate.googleapis.com", proxy=None):
+async def async_google_translate(data, url="https://translate.googleapis.com", proxy=None, session=None):
     """
     参考zotero翻译插件的代码
     https://github.com/windingwind/zotero-pdf-translate/blob/main/src/modules/services/google.ts
+
+    若传入`session`, 则复用该aiohttp会话(例如爬虫共享的连接池), 否则为本次翻译临时创建一个
     """
+    if session is None:
+        async with aiohttp.ClientSession(trust_env=True) as session:
+            return await async_google_translate(data, url=url, proxy=proxy, session=session)
+
     error = 0
     while error <= 3:
         try:
-            async with aiohttp.ClientSession(trust_env=True) as session:
-                async with session.get(
-                    f"{data.secret if data.secret else url}/translate_a/single",
-                    proxy=proxy,
-                    params={
-                        "client": "gtx",
-                        "hl": "zh-CN",
-                        "dt": [
-                            "at",
-                            "bd",
-                            "ex",
-                            "ld",
-                            "md",
-                            "qca",
-                            "rw",
-                            "rm",
-                            "ss",
-                            "t",
-                        ],
-                        "source": "bh",
-                        "ssel": "0",
-                        "tsel": "0",
-                        "kc": "1",
-                        "tk": TL(data.raw),
-                        "q": data.raw,
-                        "sl": data.langfrom,
-                        "tl": data.langto,
-                    },
-                ) as response:
-                    response.raise_for_status()
-
-                    result = ""
-                    json_response = await response.json()
-                    for item in json_response[0]:
-                        if item and item[0]:
-                            result += item[0]
-
-                    data.result = result
-                return
+            async with session.get(
+                f"{data.secret if data.secret else url}/translate_a/single",
+                proxy=proxy,
+                params={
+                    "client": "gtx",
+                    "hl": "zh-CN",
+                    "dt": [
+                        "at",
+                        "bd",
+                        "ex",
+                        "ld",
+                        "md",
+                        "qca",
+                        "rw",
+                        "rm",
+                        "ss",
+                        "t",
+                    ],
+                    "source": "bh",
+                    "ssel": "0",
+                    "tsel": "0",
+                    "kc": "1",
+                    "tk": TL(data.raw),
+                    "q": data.raw,
+                    "sl": data.langfrom,
+                    "tl": data.langto,
+                },
+            ) as response:
+                response.raise_for_status()
+
+                result = ""
+                json_response = await response.json()
+                for item in json_response[0]:
+                    if item and item[0]:
+                        result += item[0]
+
+                data.result = result
+            return
         except Exception as e:
             error += 1
             pass
 
 
-async def async_translate(text, langto="zh-CN", proxy=None):
+async def async_translate(text, langto="zh-CN", proxy=None, session=None, cache=True):
+    """
+    翻译文本, 默认先查询翻译缓存(见translation_cache), 只有未命中时才请求翻译接口, 成功的结果会写入缓存
+
+    Args:
+        cache (bool, optional): 是否使用翻译缓存. Defaults to True.
+    """
     task = TranslateTask(raw=text, langto=langto)
-    await async_google_translate(task, proxy=proxy)
+    translation_cache = default_cache() if cache else None
+    if translation_cache is not None:
+        result = await translation_cache.aget(task.raw, task.langfrom, task.langto, BACKEND)
+        if result is not None:
+            return result
+    await async_google_translate(task, proxy=proxy, session=session)
+    if translation_cache is not None and task.result is not None:
+        await translation_cache.aput(task.raw, task.langfrom, task.langto, BACKEND, task.result)
     return task.result
 
 
+def pack_segments(texts: list[str], max_chars=4500) -> list[list[int]]:
+    """
+    把待翻译的文本按顺序装入若干批, 每批加上分隔符后不超过`max_chars`个字符。
+    超过预算或自身包含分隔符的文本单独成批
+
+    Returns:
+        list[list[int]]: 每批包含的文本下标
+    """
+    batches = []
+    batch, size = [], 0
+    for i, text in enumerate(texts):
+        length = len(text) + len(SEGMENT_MARKER.format(i)) + 2
+        if length > max_chars or SEGMENT_PATTERN.search(text):
+            batches.append([i])
+            continue
+        if batch and size + length > max_chars:
+            batches.append(batch)
+            batch, size = [], 0
+        batch.append(i)
+        size += length
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def join_segments(texts: list[str]) -> str:
+    return "\n".join(f"{SEGMENT_MARKER.format(i)}\n{text}" for i, text in enumerate(texts))
+
+
+def split_segments(result: str, count: int) -> list[str] | None:
+    """
+    按分隔符把批量译文切分回各个分段, 分隔符丢失、重复或顺序错乱时返回None
+    """
+    parts = SEGMENT_PATTERN.split(result)
+    if parts[0].strip() or len(parts) != 2 * count + 1:
+        return None
+    if [int(index) for index in parts[1::2]] != list(range(count)):
+        return None
+    return [segment.strip() for segment in parts[2::2]]
+
+
+async def async_translate_batch(
+    texts, langto="zh-CN", proxy=None, session=None, max_chars=4500, cache=True, rate_controller=None
+):
+    """
+    批量翻译多段文本: 把未命中缓存的文本用编号分隔符拼接, 每个请求不超过`max_chars`个字符,
+    再把译文按分隔符切分回各个分段。切分结果对不上时, 该批退回逐条翻译。
+    所有请求都经过`rate_controller`限制并发和速率, 大量文本也不会同时涌向翻译接口
+
+    Args:
+        texts (list[str | None]): 待翻译的文本, None和空字符串原样返回
+        max_chars (int, optional): 每个请求的字符预算. Defaults to 4500.
+        cache (bool, optional): 是否使用翻译缓存. Defaults to True.
+        rate_controller (RateController | None, optional): 限速器, None表示共享的`TRANSLATE_RATE_CONTROLLER`. Defaults to None.
+
+    Returns:
+        list[str | None]: 与`texts`一一对应的译文, 翻译失败的为None
+    """
+    results = [text if not text else None for text in texts]
+    translation_cache = default_cache() if cache else None
+    # 相同的文本只翻译一次
+    pending: dict[str, list[int]] = {}
+    for i, text in enumerate(texts):
+        if not text:
+            continue
+        if translation_cache is not None:
+            result = await translation_cache.aget(text, "en", langto, BACKEND)
+            if result is not None:
+                results[i] = result
+                continue
+        pending.setdefault(text, []).append(i)
+    unique = list(pending)
+    rate_controller = rate_controller if rate_controller is not None else TRANSLATE_RATE_CONTROLLER
+
+    async def request(task: TranslateTask):
+        async with rate_controller:
+            await async_google_translate(task, proxy=proxy, session=session)
+
+    async def translate_one(text):
+        # 已经确认未命中缓存, 直接请求
+        task = TranslateTask(raw=text, langto=langto)
+        await request(task)
+        if translation_cache is not None and task.result is not None:
+            await translation_cache.aput(text, task.langfrom, langto, BACKEND, task.result)
+        return task.result
+
+    async def translate_batch(batch: list[int]):
+        segments = [unique[i] for i in batch]
+        if len(segments) == 1:
+            return [await translate_one(segments[0])]
+        task = TranslateTask(raw=join_segments(segments), langto=langto)
+        await request(task)
+        translated = split_segments(task.result, len(segments)) if task.result is not None else None
+        if translated is None:
+            return await asyncio.gather(*[translate_one(segment) for segment in segments])
+        if translation_cache is not None:
+            for segment, result in zip(segments, translated):
+                await translation_cache.aput(segment, task.langfrom, langto, BACKEND, result)
+        return translated
+
+    batches = pack_segments(unique, max_chars)
+    for batch, translated in zip(batches, await asyncio.gather(*[translate_batch(batch) for batch in batches])):
+        for i, result in zip(batch, translated):
+            for index in pending[unique[i]]:
+                results[index] = result
+    return results
+
+
 def google_translate(data, url="https://translate.googleapis.com", proxy=None):
     """同步调用Google翻译API
     
@@ -189,9 +331,19 @@ def google_translate(data, url="https://translate.googleapis.com", proxy=None):
     data.result = result
 
 
-def translate(text, langto="zh-CN", proxy=None):
+def translate(text, langto="zh-CN", proxy=None, cache=True):
+    """
+    `async_translate`的同步版本, 与其共享翻译缓存
+    """
     task = TranslateTask(raw=text, langto=langto)
+    translation_cache = default_cache() if cache else None
+    if translation_cache is not None:
+        result = translation_cache.get(task.raw, task.langfrom, task.langto, BACKEND)
+        if result is not None:
+            return result
     google_translate(task, proxy=proxy)
+    if translation_cache is not None and task.result is not None:
+        translation_cache.put(task.raw, task.langfrom, task.langto, BACKEND, task.result)
     return task.result
 
 
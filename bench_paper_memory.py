@@ -0,0 +1,70 @@
+import argparse
+import gc
+import random
+import tempfile
+import time
+import tracemalloc
+
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from paper import Paper, PaperDatabase
+
+CATEGORIES = ["cs.CL", "cs.CV", "cs.AI", "cs.LG", "cs.IR", "cs.MA", "stat.ML", "math.OC", "eess.AS", "q-bio.NC"]
+
+
+def make_papers(n: int):
+    """
+    生成`n`篇字段长度接近真实数据的文章
+    """
+    words = [f"word{i}" for i in range(5000)]
+    day = datetime(2020, 1, 1)
+    for i in range(n):
+        if i % 500 == 0:
+            day += timedelta(days=1)
+        yield Paper(
+            first_submitted_date=day,
+            title=" ".join(random.choices(words, k=12)),
+            categories=random.sample(CATEGORIES, random.randint(1, 3)),
+            url=f"https://arxiv.org/abs/{2001 + i // 100000}.{i % 100000:05d}",
+            authors=", ".join(random.choices(words, k=6)),
+            abstract=" ".join(random.choices(words, k=180)),
+            comments="10 pages, 3 figures",
+            first_announced_date=day + timedelta(days=1),
+        )
+
+
+def measure(label, load):
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    papers = load()
+    elapsed = time.perf_counter() - started
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<28} {len(papers):>8} papers  {current / 2**20:>8.1f} MiB  {current / len(papers):>7.0f} B/paper  {elapsed:.2f}s")
+    del papers
+    return current
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="比较fetch_all返回Paper与CompactPaper时的内存占用")
+    parser.add_argument("--papers", type=int, default=100000, help="生成的文章数")
+    parser.add_argument("--db", type=str, default=None, help="使用已有的数据库, 而不是生成临时数据库")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if args.db:
+            paper_db = PaperDatabase(args.db)
+        else:
+            paper_db = PaperDatabase(str(Path(tmp_dir) / "bench.db"))
+            papers = list(make_papers(args.papers))
+            for i in range(0, len(papers), 10000):
+                paper_db.add_papers(papers[i : i + 10000])
+            del papers
+
+        baseline = measure("Paper", paper_db.fetch_all)
+        eager = measure("CompactPaper", lambda: paper_db.fetch_all(compact=True, lazy_abstract=False))
+        lazy = measure("CompactPaper (lazy abstract)", lambda: paper_db.fetch_all(compact=True))
+        print(f"saving: {1 - eager / baseline:.0%} (eager), {1 - lazy / baseline:.0%} (lazy abstract)")
+        paper_db.close()
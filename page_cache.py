@@ -0,0 +1,105 @@
+import gzip
+import hashlib
+import json
+import os
+import time
+
+from pathlib import Path
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+
+class PageCache:
+    """
+    arxiv搜索页面的磁盘缓存。
+
+    页面以gzip压缩保存, 文件名是规范化后的url(查询参数排序)的sha256, 因此相同参数的搜索总会命中同一个文件。
+    每个文件的第一行是记录url和写入时间的json, 其余部分是页面内容。
+    过期时间(`ttl`)按写入时间计算; 总大小超过`max_bytes`时按最近使用时间(文件mtime)淘汰。
+    """
+
+    def __init__(self, cache_dir="./page_cache", ttl=7 * 24 * 3600, max_bytes=1024**3):
+        """
+        Args:
+            cache_dir (str, optional): 缓存目录. Defaults to "./page_cache".
+            ttl (float | None, optional): 缓存有效秒数, None表示永不过期. Defaults to 7天.
+            max_bytes (int, optional): 缓存目录的容量上限. Defaults to 1GB.
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(exist_ok=True, parents=True)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.size: int | None = None  # 首次写入时统计
+
+    @staticmethod
+    def key(url: str) -> str:
+        parts = urlsplit(url)
+        query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+        return hashlib.sha256(f"{parts.netloc}{parts.path}?{query}".encode()).hexdigest()
+
+    def path(self, url: str) -> Path:
+        key = self.key(url)
+        return self.cache_dir / key[:2] / f"{key}.gz"
+
+    def get(self, url: str, allow_expired=False) -> str | None:
+        """
+        读取缓存的页面内容
+
+        Args:
+            url (str): 页面url
+            allow_expired (bool, optional): 是否返回已过期的内容, 离线重放时使用. Defaults to False.
+
+        Returns:
+            str | None: 页面内容, 未命中时返回None
+        """
+        path = self.path(url)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                meta = json.loads(f.readline())
+                if not allow_expired and self.ttl is not None and time.time() - meta["created"] > self.ttl:
+                    return None
+                content = f.read()
+        except (FileNotFoundError, EOFError, OSError, ValueError):
+            return None
+        os.utime(path)  # 记录最近使用时间
+        return content
+
+    def put(self, url: str, content: str):
+        path = self.path(url)
+        path.parent.mkdir(exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            f.write(json.dumps({"url": url, "created": time.time()}) + "\n")
+            f.write(content)
+        old_size = path.stat().st_size if path.exists() else 0
+        os.replace(tmp_path, path)
+        if self.size is None:
+            self.size = sum(entry.stat().st_size for entry in self.entries())
+        else:
+            self.size += path.stat().st_size - old_size
+        if self.size > self.max_bytes:
+            self.evict()
+
+    def entries(self) -> list[Path]:
+        return list(self.cache_dir.glob("*/*.gz"))
+
+    def evict(self):
+        """
+        删除过期的页面, 然后按最近使用时间从旧到新删除, 直到总大小不超过`max_bytes`的90%
+        """
+        now = time.time()
+        stats = []
+        for entry in self.entries():
+            stat = entry.stat()
+            if self.ttl is not None and now - stat.st_mtime > self.ttl:
+                # mtime不早于写入时间, mtime过期说明内容也一定过期了
+                entry.unlink(missing_ok=True)
+            else:
+                stats.append((stat.st_mtime, stat.st_size, entry))
+        stats.sort()
+        size = sum(entry_size for _, entry_size, _ in stats)
+        for _, entry_size, entry in stats:
+            if size <= self.max_bytes * 0.9:
+                break
+            entry.unlink(missing_ok=True)
+            size -= entry_size
+        self.size = size
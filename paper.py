@@ -1,21 +1,30 @@
+import aiohttp
 import asyncio
 import csv
+import hashlib
 import shutil
 import sqlite3
 import os
+import sys
+import threading
+import numpy as np
 import ollama
 import subprocess
 
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache, partial
 from dataclasses import dataclass, fields
-from datetime import datetime, timedelta, UTC
+from datetime import date, datetime, timedelta, UTC
 from pathlib import Path
+from typing import NamedTuple
 from ollama import Client
 
 from rich.console import Console
-from typing_extensions import Iterable
+from typing_extensions import Callable, Iterable, Iterator
 
-from async_translator import async_translate
+from async_translator import async_translate_batch
 from ftp_client import FTPClient
 from proc_md_files import ProcFiles
 from categories import parse_categories
@@ -232,9 +241,22 @@ class Paper:
 
 """
     
-    async def translate(self, langto="zh-CN"):
-        self.title_translated = await async_translate(self.title, langto=langto)
-        self.abstract_translated = await async_translate(self.abstract, langto=langto)
+    async def translate(self, langto="zh-CN", proxy=None, session=None):
+        # 标题和摘要合并为一个请求
+        self.title_translated, self.abstract_translated = await async_translate_batch(
+            [self.title, self.abstract], langto=langto, proxy=proxy, session=session
+        )
+
+
+async def translate_papers(papers: list[Paper], langto="zh-CN", proxy=None, session=None, max_chars=4500):
+    """
+    批量翻译多篇文章的标题和摘要, 多篇文章的文本合并到同一个请求中(见`async_translate_batch`)
+    """
+    texts = [text for paper in papers for text in (paper.title, paper.abstract)]
+    translated = await async_translate_batch(texts, langto=langto, proxy=proxy, session=session, max_chars=max_chars)
+    for paper, title_translated, abstract_translated in zip(papers, translated[::2], translated[1::2]):
+        paper.title_translated = title_translated
+        paper.abstract_translated = abstract_translated
 
 
 @dataclass
@@ -259,23 +281,568 @@ class PaperRecord:
             return self.paper.to_markdown(ftp_config, ollama_config, file_path_config)
 
 
+def content_hash(title: str, abstract: str) -> str:
+    """
+    标题和摘要(即需要翻译的原文)的摘要值, 原文不变时已有的翻译仍然有效
+    """
+    return hashlib.blake2b(f"{title}\n{abstract}".encode(), digest_size=16).hexdigest()
+
+
+class UpsertCounts(NamedTuple):
+    """
+    `PaperDatabase.add_papers`的写入统计: 新增、内容有变化而更新、以及完全未变化(未写入)的文章数
+    """
+
+    inserted: int
+    updated: int
+    unchanged: int
+
+
+# CompactPaper尚未加载摘要时的占位
+_NOT_LOADED = object()
+
+
+def _to_ordinal(value: datetime | date | str | int) -> int:
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str):
+        return date.fromisoformat(value).toordinal()
+    return value.toordinal()
+
+
+@lru_cache(maxsize=4096)
+def _category_tuple(key: str) -> tuple[str, ...]:
+    """
+    分类字符串(逗号分隔) -> 驻留的分类元组。分类组合的种类远少于文章数, 有上限的缓存足以让它们共享同一个元组,
+    又不会在长时间运行的进程中无限增长
+    """
+    return tuple(sys.intern(c) for c in key.split(",") if c)
+
+
+class CompactPaper:
+    """
+    内存紧凑的`Paper`, 用于一次性持有大量文章的场景, 属性与`Paper`相同:
+        - 使用`__slots__`, 没有实例字典
+        - 分类保存为驻留的元组, 分类组合相同的文章共享同一个元组对象
+        - 日期保存为序数(`date.toordinal`), 访问时才转换为`datetime`
+        - 摘要及其翻译可以延迟加载: 构造时传入`loader`而不传摘要, 首次访问时由`loader(url)`读取
+    需要`Paper`的方法(如翻译、导出)时调用`to_paper`
+    """
+
+    __slots__ = (
+        "url",
+        "title",
+        "authors",
+        "comments",
+        "title_translated",
+        "_categories",
+        "_submitted",
+        "_announced",
+        "_abstract",
+        "_abstract_translated",
+        "_loader",
+    )
+
+    def __init__(
+        self,
+        first_submitted_date,
+        title: str,
+        categories,
+        url: str,
+        authors: str,
+        abstract=_NOT_LOADED,
+        comments: str = "",
+        title_translated: str | None = None,
+        abstract_translated=_NOT_LOADED,
+        first_announced_date=None,
+        loader=None,
+    ):
+        if loader is None and abstract is _NOT_LOADED:
+            raise TypeError("CompactPaper requires `abstract` or a `loader`")
+        self.url = url
+        self.title = title
+        self.authors = authors
+        self.comments = comments
+        self.title_translated = title_translated
+        self.categories = categories
+        self.first_submitted_date = first_submitted_date
+        self.first_announced_date = first_announced_date
+        self._abstract = abstract
+        self._abstract_translated = None if abstract_translated is _NOT_LOADED and loader is None else abstract_translated
+        self._loader = loader
+
+    @property
+    def categories(self) -> tuple[str, ...]:
+        return self._categories
+
+    @categories.setter
+    def categories(self, value: str | Iterable[str]):
+        self._categories = _category_tuple(value if isinstance(value, str) else ",".join(value))
+
+    @property
+    def first_submitted_date(self) -> datetime:
+        return datetime.fromordinal(self._submitted)
+
+    @first_submitted_date.setter
+    def first_submitted_date(self, value):
+        self._submitted = _to_ordinal(value)
+
+    @property
+    def first_announced_date(self) -> datetime | None:
+        return None if self._announced is None else datetime.fromordinal(self._announced)
+
+    @first_announced_date.setter
+    def first_announced_date(self, value):
+        self._announced = None if value is None else _to_ordinal(value)
+
+    def _load(self):
+        self._abstract, self._abstract_translated = self._loader(self.url)
+
+    @property
+    def abstract(self) -> str:
+        if self._abstract is _NOT_LOADED:
+            self._load()
+        return self._abstract
+
+    @abstract.setter
+    def abstract(self, value: str):
+        self._abstract = value
+
+    @property
+    def abstract_translated(self) -> str | None:
+        if self._abstract_translated is _NOT_LOADED:
+            self._load()
+        return self._abstract_translated
+
+    @abstract_translated.setter
+    def abstract_translated(self, value: str | None):
+        if self._abstract is _NOT_LOADED:
+            self._load()
+        self._abstract_translated = value
+
+    @classmethod
+    def from_paper(cls, paper: Paper) -> "CompactPaper":
+        return cls(**{field.name: getattr(paper, field.name) for field in fields(Paper)})
+
+    def to_paper(self) -> Paper:
+        paper = Paper(**{field.name: getattr(self, field.name) for field in fields(Paper)})
+        paper.categories = list(paper.categories)
+        return paper
+
+    def __repr__(self):
+        return f"CompactPaper(url={self.url!r}, title={self.title!r})"
+
+
+class PaperRow:
+    """
+    `PaperDatabase.iter_papers`产出的惰性行, 属性名与`Paper`相同, 但只包含查询的列;
+    日期和分类在访问时才解析, 只用到url/title的调用者不需要为其他列付出解析开销
+    """
+
+    __slots__ = ("_columns", "_row")
+
+    DATE_COLUMNS = frozenset(("first_submitted_date", "first_announced_date"))
+
+    def __init__(self, columns: dict[str, int], row: tuple):
+        self._columns = columns
+        self._row = row
+
+    def __getattr__(self, name):
+        try:
+            value = self._row[self._columns[name]]
+        except KeyError:
+            raise AttributeError(f"column {name!r} is not selected") from None
+        if name in self.DATE_COLUMNS:
+            return datetime.strptime(value, "%Y-%m-%d")
+        if name == "categories":
+            return value.split(",")
+        return value
+
+    def to_paper(self) -> Paper:
+        return Paper(**{field.name: getattr(self, field.name) for field in fields(Paper)})
+
+
+class SearchHit(NamedTuple):
+    """
+    全文检索的一条结果
+
+    Attributes:
+        paper (Paper): 文章
+        score (float): bm25得分, 越小越相关
+        snippet (str): 命中位置附近的片段, 命中的词由高亮标记包围
+    """
+
+    paper: Paper
+    score: float
+    snippet: str
+
+
+def fts_query(text: str) -> str:
+    """
+    把用户输入的关键词转换为FTS5查询: 每个词作为短语(避免"GPT-4"、"cs.CL"中的符号被当作查询语法), 各词之间为AND
+    """
+    return " ".join('"' + term.replace('"', '""') + '"' for term in text.split())
+
+
+class BloomFilter:
+    """
+    用于url去重的布隆过滤器, 可能误报但不会漏报, 内存占用约为每个元素`bits_per_item`位
+    """
+
+    def __init__(self, capacity: int, bits_per_item: int = 10, hashes: int = 7):
+        self.size = max(64, capacity * bits_per_item)
+        self.hashes = hashes
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little")
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item: str):
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+
+class UrlIndex:
+    """
+    已入库url的成员索引, 一次调用即可判断一整页url是否已存在。
+
+    mode:
+        - "set": 首次查询时从数据库加载全部url到内存中的集合, 之后不再访问数据库
+        - "bloom": 加载为布隆过滤器, 内存更省; 过滤器判定可能存在的url再用批量`IN`查询确认
+        - "sql": 不使用内存索引, 每`batch_size`个url一条`WHERE url IN (...)`查询
+    内存索引在`PaperDatabase.add_papers`写入时同步更新
+    """
+
+    def __init__(self, connect: Callable[[], sqlite3.Connection], mode="set", batch_size=500):
+        """
+        Args:
+            connect (Callable[[], sqlite3.Connection]): 返回当前线程可用的只读连接, 通常是`PaperDatabase.reader`
+        """
+        if mode not in ("set", "bloom", "sql"):
+            raise ValueError(f"Unknown url index mode: {mode}")
+        self.connect = connect
+        self.mode = mode
+        self.batch_size = batch_size
+        self.urls: set[str] | BloomFilter | None = None
+        # 保证加载期间写入的url不会丢失
+        self._lock = threading.Lock()
+
+    def _cursor(self) -> sqlite3.Cursor:
+        # 跳过PaperDatabase的row_factory, 直接返回元组
+        cursor = self.connect().cursor()
+        cursor.row_factory = None
+        return cursor
+
+    def _load(self):
+        with self._lock:
+            if self.urls is not None:
+                return
+            cursor = self._cursor().execute("SELECT url FROM papers")
+            if self.mode == "set":
+                self.urls = {row[0] for row in cursor}
+            else:
+                count = self._cursor().execute("SELECT COUNT(*) FROM papers").fetchone()[0]
+                # 预留增长空间, 避免持续写入后误报率升高
+                urls = BloomFilter(capacity=2 * count + 100_000)
+                for row in cursor:
+                    urls.add(row[0])
+                self.urls = urls
+
+    def add(self, urls: Iterable[str]):
+        with self._lock:
+            if self.urls is None:
+                return  # 尚未加载, 加载时会读到这些url
+            for url in urls:
+                self.urls.add(url)
+
+    def _query(self, urls: list[str]) -> set[str]:
+        known = set()
+        for i in range(0, len(urls), self.batch_size):
+            batch = urls[i : i + self.batch_size]
+            cursor = self._cursor().execute(
+                f"SELECT url FROM papers WHERE url IN ({','.join('?' * len(batch))})",
+                batch,
+            )
+            known.update(row[0] for row in cursor)
+        return known
+
+    def known(self, urls: Iterable[str]) -> set[str]:
+        """
+        返回`urls`中已经存在于数据库的url
+        """
+        urls = list(urls)
+        if self.mode == "sql":
+            return self._query(urls)
+        if self.urls is None:
+            self._load()
+        if self.mode == "set":
+            return {url for url in urls if url in self.urls}
+        return self._query([url for url in urls if url in self.urls])
+
+
+def _migration_announced_date_index(conn: sqlite3.Connection):
+    # 复合索引同时服务于按首次公布日期的等值查询和newest_update_time的两个MAX查询
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_papers_announced_update ON papers (first_announced_date, update_time)"
+    )
+
+
+def _migration_paper_categories(conn: sqlite3.Connection):
+    # 分类的关联表, 每篇文章的每个分类一行; papers.categories仍保留原始顺序, 用于构造`Paper`
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS paper_categories (
+            url TEXT NOT NULL,
+            category TEXT NOT NULL,
+            PRIMARY KEY (url, category)
+        ) WITHOUT ROWID
+        """
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_paper_categories_category ON paper_categories (category, url)")
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    conn.executemany(
+        "INSERT OR IGNORE INTO paper_categories (url, category) VALUES (?, ?)",
+        (
+            (url, category)
+            for url, categories in cursor.execute("SELECT url, categories FROM papers")
+            for category in categories.split(",")
+            if category
+        ),
+    )
+
+
+def _create_fts_triggers(conn: sqlite3.Connection):
+    # 由触发器同步papers_fts; executescript会先提交当前事务, 因此逐条创建触发器, 保证迁移的原子性
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS papers_fts_insert AFTER INSERT ON papers BEGIN
+            INSERT INTO papers_fts (rowid, title, abstract, title_translated, abstract_translated)
+            VALUES (new.rowid, new.title, new.abstract, new.title_translated, new.abstract_translated);
+        END
+        """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS papers_fts_delete AFTER DELETE ON papers BEGIN
+            INSERT INTO papers_fts (papers_fts, rowid, title, abstract, title_translated, abstract_translated)
+            VALUES ('delete', old.rowid, old.title, old.abstract, old.title_translated, old.abstract_translated);
+        END
+        """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS papers_fts_update
+        AFTER UPDATE OF title, abstract, title_translated, abstract_translated ON papers BEGIN
+            INSERT INTO papers_fts (papers_fts, rowid, title, abstract, title_translated, abstract_translated)
+            VALUES ('delete', old.rowid, old.title, old.abstract, old.title_translated, old.abstract_translated);
+            INSERT INTO papers_fts (rowid, title, abstract, title_translated, abstract_translated)
+            VALUES (new.rowid, new.title, new.abstract, new.title_translated, new.abstract_translated);
+        END
+        """
+    )
+
+
+def _migration_full_text_search(conn: sqlite3.Connection):
+    # 以papers为外部内容的FTS5索引, 只保存倒排索引, 由触发器与papers同步
+    conn.execute(
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS papers_fts USING fts5(
+            title, abstract, title_translated, abstract_translated,
+            content = 'papers', content_rowid = 'rowid', tokenize = 'unicode61 remove_diacritics 2'
+        )
+        """
+    )
+    _create_fts_triggers(conn)
+    conn.execute("INSERT INTO papers_fts (papers_fts) VALUES ('rebuild')")
+
+
+def _migration_content_hash(conn: sqlite3.Connection):
+    conn.execute("ALTER TABLE papers ADD COLUMN content_hash TEXT")
+    conn.create_function("content_hash", 2, content_hash, deterministic=True)
+    conn.execute("UPDATE papers SET content_hash = content_hash(title, abstract)")
+
+
+def _migration_paper_id(conn: sqlite3.Connection):
+    # papers_fts通过rowid关联papers, 但papers的主键是url, VACUUM可能重新编号这种表的rowid, 使全文索引错位。
+    # 重建papers, 增加INTEGER PRIMARY KEY列`id`作为rowid的别名(沿用原来的rowid), 之后rowid不会再被VACUUM改变;
+    # 删除旧表会一并删除触发器, 因此重新创建触发器, 并重建一次全文索引以修复之前可能已经发生的错位
+    conn.execute(
+        """
+        CREATE TABLE papers_new (
+            id INTEGER PRIMARY KEY,
+            url TEXT NOT NULL UNIQUE,
+            authors TEXT NOT NULL,
+            title_translated TEXT,
+            first_submitted_date DATE NOT NULL,
+            first_announced_date DATE NOT NULL,
+            update_time DATETIME NOT NULL,
+            categories TEXT NOT NULL,
+            title TEXT NOT NULL,
+            comments TEXT NOT NULL,
+            abstract TEXT NOT NULL,
+            abstract_translated TEXT,
+            content_hash TEXT
+        )
+        """
+    )
+    columns = (
+        "url, authors, title_translated, first_submitted_date, first_announced_date, update_time, "
+        "categories, title, comments, abstract, abstract_translated, content_hash"
+    )
+    conn.execute(f"INSERT INTO papers_new (id, {columns}) SELECT rowid, {columns} FROM papers")
+    conn.execute("DROP TABLE papers")
+    conn.execute("ALTER TABLE papers_new RENAME TO papers")
+    _migration_announced_date_index(conn)
+    _create_fts_triggers(conn)
+    conn.execute("INSERT INTO papers_fts (papers_fts) VALUES ('rebuild')")
+
+
+# 数据库结构的版本迁移, 第i个迁移把`PRAGMA user_version`从i升级到i+1; 只能在末尾追加, 不能修改已发布的迁移
+MIGRATIONS = [
+    _migration_announced_date_index,
+    _migration_paper_categories,
+    _migration_full_text_search,
+    _migration_content_hash,
+    _migration_paper_id,
+]
+
+
+def category_filter_sql(n_whitelist: int, n_blacklist: int, chosen_only=False) -> str:
+    """
+    按分类白名单/黑名单筛选某一天文章的查询, 参数依次为白名单分类, 黑名单分类, 首次公布日期。
+    结果在papers的所有列之后附加`reason`列: 入选为"-", 否则为被筛除的原因
+    """
+    whitelist = ",".join("?" * n_whitelist)
+    blacklist = ",".join("?" * n_blacklist)
+    sql = f"""
+        SELECT *,
+            CASE
+                WHEN NOT whitelisted THEN 'none of ' || categories || ' in whitelist'
+                WHEN blacklisted IS NOT NULL THEN 'cat:' || blacklisted || ' in blacklist'
+                ELSE '-'
+            END AS reason
+        FROM (
+            SELECT papers.*,
+                EXISTS (
+                    SELECT 1 FROM paper_categories c WHERE c.url = papers.url AND c.category IN ({whitelist})
+                ) AS whitelisted,
+                (
+                    SELECT group_concat(c.category) FROM paper_categories c
+                    WHERE c.url = papers.url AND c.category IN ({blacklist})
+                ) AS blacklisted
+            FROM papers
+            WHERE first_announced_date = ?
+        )
+    """
+    if chosen_only:
+        sql += " WHERE whitelisted AND blacklisted IS NULL"
+    return sql
+
+
 class PaperDatabase:
-    def __init__(self, db_path="papers.db"):
-        self.conn = sqlite3.connect(db_path)
-        self.conn.row_factory = self._row_factory
+    # 频繁执行的查询及用于检查执行计划的示例参数, 见`explain_hot_queries`
+    HOT_QUERIES = {
+        "fetch_papers_on_date": (
+            "SELECT * FROM papers WHERE first_announced_date = ?",
+            ("2024-01-01",),
+        ),
+        "newest_update_time": (
+            """
+            SELECT MAX(update_time) as max_updated_time
+            FROM papers
+            WHERE first_announced_date = (SELECT MAX(first_announced_date) FROM papers)
+            """,
+            (),
+        ),
+        "fetch_filtered_papers_on_date": (
+            category_filter_sql(1, 1),
+            ("cs.CL", "cs.CV", "2024-01-01"),
+        ),
+    }
+
+    def __init__(self, db_path="papers.db", url_index="set", busy_timeout=30.0):
+        """
+        数据库使用WAL模式, 读写可以同时进行:
+            - 所有写入都通过`self.conn`(唯一的写连接)并由锁串行化, 可以从任意线程调用
+            - 读取使用每个线程各自的只读连接(`reader`), 不会被写事务阻塞
+
+        Args:
+            db_path (str, optional): 数据库路径. Defaults to "papers.db".
+            url_index (str, optional): url去重索引的模式, "set", "bloom"或"sql", 见`UrlIndex`. Defaults to "set".
+            busy_timeout (float, optional): 其他进程持有写锁时的等待秒数. Defaults to 30.0.
+        """
+        self.db_path = db_path
+        self.busy_timeout = busy_timeout
+        self.conn = self._connect()
+        self._write_lock = threading.RLock()
+        self._local = threading.local()
+        self._readers: list[sqlite3.Connection] = []
         self._create_table()
+        self._migrate()
+        self.url_index = UrlIndex(self.reader, mode=url_index)
+
+    def _connect(self, readonly=False) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout, check_same_thread=False)
+        conn.row_factory = self._row_factory
+        if not readonly:
+            # journal_mode是持久化的, 只需由写连接设置一次
+            conn.execute("PRAGMA journal_mode = WAL")
+        # WAL模式下NORMAL不会损坏数据库, 只是掉电时可能丢失最后几个事务
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout * 1000)}")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        conn.execute("PRAGMA cache_size = -65536")  # 64MB
+        # INSERT OR REPLACE删除旧行时也要触发papers的DELETE触发器, 否则全文索引会残留旧内容
+        conn.execute("PRAGMA recursive_triggers = ON")
+        if readonly:
+            conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    def reader(self) -> sqlite3.Connection:
+        """
+        当前线程的只读连接, 首次调用时创建; 可以安全地在线程池或进程内的其他线程中使用
+        """
+        if self.db_path == ":memory:":
+            return self.conn  # 内存数据库无法被其他连接共享
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect(readonly=True)
+            with self._write_lock:
+                self._readers.append(conn)
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        """
+        在写连接上开启一个事务, 正常结束时提交, 异常时回滚
+        """
+        with self._write_lock, self.conn:
+            yield self.conn
+
+    def close(self):
+        with self._write_lock:
+            for conn in self._readers:
+                conn.close()
+            self._readers.clear()
+            self.conn.close()
 
     @staticmethod
     def _row_factory(cursor, row):
         row = sqlite3.Row(cursor, row)
-        # all fields in Paper, plus `update_time`
-        if len(row.keys()) == len(fields(Paper)) + 1:
+        # all fields in Paper, plus `id`, `update_time` and `content_hash`
+        if len(row.keys()) == len(fields(Paper)) + 3:
             return Paper.from_row(row)
         else:
             return row
 
     def _create_table(self):
-        with self.conn:
+        with self._transaction():
             self.conn.execute(
                 """
                 CREATE TABLE IF NOT EXISTS papers (
@@ -293,103 +860,725 @@ class PaperDatabase:
                 )
             """
             )
+            # fetch_all的断点记录: 每个搜索(以url指纹区分)一条任务, 每个已完成或失败的页面一条记录;
+            # 页面中的文章在完成时已写入papers, 这里只记录起始序号和状态
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS crawl_jobs (
+                    fingerprint TEXT PRIMARY KEY,
+                    url TEXT NOT NULL,
+                    total INTEGER NOT NULL,
+                    status TEXT NOT NULL,
+                    update_time DATETIME NOT NULL
+                )
+            """
+            )
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS crawl_pages (
+                    fingerprint TEXT NOT NULL,
+                    start INTEGER NOT NULL,
+                    status TEXT NOT NULL,
+                    error TEXT,
+                    PRIMARY KEY (fingerprint, start)
+                )
+            """
+            )
+
+    def _migrate(self):
+        """
+        依次执行数据库尚未应用的迁移, 每个迁移在一个独立的事务中完成并更新`user_version`
+        """
+        for version in range(self.conn.execute("PRAGMA user_version").fetchone()[0], len(MIGRATIONS)):
+            with self._write_lock:
+                self.conn.execute("BEGIN IMMEDIATE")
+                try:
+                    # 其他进程可能已经完成了这个迁移
+                    if self.conn.execute("PRAGMA user_version").fetchone()[0] == version:
+                        MIGRATIONS[version](self.conn)
+                        self.conn.execute(f"PRAGMA user_version = {version + 1}")
+                    self.conn.commit()
+                except BaseException:
+                    self.conn.rollback()
+                    raise
+
+    def explain_hot_queries(self) -> dict[str, list[str]]:
+        """
+        获取`HOT_QUERIES`中每个查询的执行计划
+
+        Returns:
+            dict[str, list[str]]: 查询名到`EXPLAIN QUERY PLAN`各行描述的映射
+        """
+        # 使用新的连接, 避免语句缓存中在结构变更前编译的执行计划
+        conn = self.conn if self.db_path == ":memory:" else self._connect(readonly=True)
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        try:
+            return {
+                name: [row[3] for row in cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+                for name, (sql, params) in self.HOT_QUERIES.items()
+            }
+        finally:
+            if conn is not self.conn:
+                conn.close()
+
+    def unindexed_hot_queries(self) -> list[str]:
+        """
+        返回执行计划中包含不使用索引的全表扫描或查找的查询名, 所有热点查询都走索引时返回空列表
+        """
+        return [
+            name
+            for name, plan in self.explain_hot_queries().items()
+            if any(
+                step.startswith(("SCAN", "SEARCH")) and " USING " not in step and "SUBQUERY" not in step
+                for step in plan
+            )
+        ]
+
+    def add_papers(self, papers: Iterable[Paper], overwrite=True) -> UpsertCounts:
+        """
+        写入文章。已存在的文章只在内容有变化时更新; 标题或摘要变化时(以`content_hash`判断)已有的翻译作废,
+        否则保留数据库中的翻译(除非传入了新的翻译), 避免重新爬取后重复翻译
 
-    def add_papers(self, papers: Iterable[Paper]):
+        Args:
+            overwrite (bool, optional): 是否更新已存在的文章, 为False时只插入新文章, 用于来源不如搜索页面准确的数据
+                (例如OAI-PMH回填的首次公布日期只是推断值). Defaults to True.
+
+        Returns:
+            UpsertCounts: 新增、更新和未变化的文章数
+        """
+        papers = list(papers)
         assert all([paper.first_announced_date is not None for paper in papers])
-        with self.conn:
-            data_to_insert = [
-                (
-                    paper.url,
-                    paper.authors,
-                    paper.abstract,
-                    paper.title,
-                    ",".join(paper.categories),
-                    paper.first_submitted_date.strftime("%Y-%m-%d"),
-                    paper.first_announced_date.strftime("%Y-%m-%d"),
-                    paper.title_translated,
-                    paper.abstract_translated,
-                    paper.comments,
-                    datetime.now(UTC).replace(tzinfo=None)
-                )
-                for paper in papers
-            ]
-            self.conn.executemany(
+        update_time = datetime.now(UTC).replace(tzinfo=None)
+        data_to_insert = [
+            (
+                paper.url,
+                paper.authors,
+                paper.abstract,
+                paper.title,
+                ",".join(paper.categories),
+                paper.first_submitted_date.strftime("%Y-%m-%d"),
+                paper.first_announced_date.strftime("%Y-%m-%d"),
+                paper.title_translated,
+                paper.abstract_translated,
+                paper.comments,
+                update_time,
+                content_hash(paper.title, paper.abstract),
+            )
+            for paper in papers
+        ]
+        with self._transaction():
+            existing_categories = self._existing_categories([row[0] for row in data_to_insert])
+            if not overwrite:
+                data_to_insert = [row for row in data_to_insert if row[0] not in existing_categories]
+            cursor = self.conn.executemany(
                 """
-                INSERT OR REPLACE INTO papers 
-                (url, authors, abstract, title, categories, first_submitted_date, first_announced_date, title_translated, abstract_translated, comments, update_time)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                INSERT INTO papers
+                (url, authors, abstract, title, categories, first_submitted_date, first_announced_date, title_translated, abstract_translated, comments, update_time, content_hash)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (url) DO UPDATE SET
+                    authors = excluded.authors,
+                    abstract = excluded.abstract,
+                    title = excluded.title,
+                    categories = excluded.categories,
+                    first_submitted_date = excluded.first_submitted_date,
+                    first_announced_date = excluded.first_announced_date,
+                    title_translated = CASE WHEN papers.content_hash IS excluded.content_hash
+                        THEN COALESCE(excluded.title_translated, papers.title_translated)
+                        ELSE excluded.title_translated END,
+                    abstract_translated = CASE WHEN papers.content_hash IS excluded.content_hash
+                        THEN COALESCE(excluded.abstract_translated, papers.abstract_translated)
+                        ELSE excluded.abstract_translated END,
+                    comments = excluded.comments,
+                    update_time = excluded.update_time,
+                    content_hash = excluded.content_hash
+                WHERE papers.content_hash IS NOT excluded.content_hash
+                    OR papers.authors IS NOT excluded.authors
+                    OR papers.categories IS NOT excluded.categories
+                    OR papers.first_submitted_date IS NOT excluded.first_submitted_date
+                    OR papers.first_announced_date IS NOT excluded.first_announced_date
+                    OR papers.comments IS NOT excluded.comments
+                    OR excluded.title_translated IS NOT NULL AND papers.title_translated IS NOT excluded.title_translated
+                    OR excluded.abstract_translated IS NOT NULL
+                        AND papers.abstract_translated IS NOT excluded.abstract_translated
                 """,
                 data_to_insert,
             )
+            written = cursor.rowcount
+            # 只为新文章和分类有变化的文章维护分类关联表
+            changed = {
+                row[0]: row[4] for row in data_to_insert if existing_categories.get(row[0]) != row[4]
+            }
+            self.conn.executemany("DELETE FROM paper_categories WHERE url = ?", [(url,) for url in changed])
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO paper_categories (url, category) VALUES (?, ?)",
+                [(url, category) for url, categories in changed.items() for category in categories.split(",") if category],
+            )
+        self.url_index.add(row[0] for row in data_to_insert)
+        inserted = len({row[0] for row in data_to_insert} - existing_categories.keys())
+        return UpsertCounts(inserted, written - inserted, len(papers) - written)
+
+    def _existing_categories(self, urls: list[str], batch_size=500) -> dict[str, str]:
+        """
+        在写连接上查询已存在的文章及其分类, 需要持有写锁
+        """
+        cursor = self.conn.cursor()
+        cursor.row_factory = None
+        existing = {}
+        for i in range(0, len(urls), batch_size):
+            batch = urls[i : i + batch_size]
+            cursor.execute(
+                f"SELECT url, categories FROM papers WHERE url IN ({','.join('?' * len(batch))})", batch
+            )
+            existing.update(cursor.fetchall())
+        return existing
 
     def count_new_papers(self, papers: Iterable[Paper]) -> int:
-        cnt = 0
-        for paper in papers:
-            with self.conn:
-                cursor = self.conn.execute(
-                    """
-                    SELECT * FROM papers WHERE url = ?
-                    """,
-                    (paper.url,),
-                )
-                if cursor.fetchone():
-                    break
-                else:
-                    cnt += 1
-        return cnt
+        return self.count_new_urls(paper.url for paper in papers)
+
+    def count_new_urls(self, urls: Iterable[str]) -> int:
+        """
+        按顺序统计第一个已存在于数据库中的url之前有多少个新url
+        """
+        urls = list(urls)
+        known = self.known_urls(urls)
+        for cnt, url in enumerate(urls):
+            if url in known:
+                return cnt
+        return len(urls)
+
+    def known_urls(self, urls: Iterable[str]) -> set[str]:
+        """
+        一次性判断一批url是否已入库
+
+        Returns:
+            set[str]: 其中已存在于数据库的url
+        """
+        return self.url_index.known(urls)
 
     def fetch_papers_on_date(self, date: datetime) -> list[Paper]:
-        with self.conn:
-            cursor = self.conn.execute(
-                """
-                SELECT * FROM papers WHERE first_announced_date = ?
-                """,
-                (date.strftime("%Y-%m-%d"),),
+        sql, _ = self.HOT_QUERIES["fetch_papers_on_date"]
+        cursor = self.reader().execute(sql, (date.strftime("%Y-%m-%d"),))
+        return cursor.fetchall()
+
+    def fetch_filtered_papers_on_date(
+        self, date: datetime, whitelist: Iterable[str], blacklist: Iterable[str], chosen_only=False
+    ) -> list[tuple[Paper, str]]:
+        """
+        在数据库中按分类筛选某一天的文章
+
+        Args:
+            date (datetime): 首次公布日期
+            whitelist (Iterable[str]): 分类白名单, 文章至少属于其中一个分类才会入选
+            blacklist (Iterable[str]): 分类黑名单, 属于其中任一分类的文章不会入选
+            chosen_only (bool, optional): 是否只返回入选的文章. Defaults to False.
+
+        Returns:
+            list[tuple[Paper, str]]: 文章及筛选结果, 入选为"-", 否则为被筛除的原因
+        """
+        whitelist, blacklist = list(whitelist), list(blacklist)
+        cursor = self.reader().execute(
+            category_filter_sql(len(whitelist), len(blacklist), chosen_only),
+            (*whitelist, *blacklist, date.strftime("%Y-%m-%d")),
+        )
+        return [(Paper.from_row(row), row["reason"]) for row in cursor]
+
+    def count_filtered_papers_on_date(
+        self, date: datetime, whitelist: Iterable[str], blacklist: Iterable[str]
+    ) -> tuple[int, int]:
+        """
+        统计某一天按分类筛选后入选和被筛除的文章数
+
+        Returns:
+            tuple[int, int]: (入选数, 筛除数)
+        """
+        whitelist, blacklist = list(whitelist), list(blacklist)
+        row = self.reader().execute(
+            f"""
+            SELECT COALESCE(SUM(reason = '-'), 0) AS chosen, COALESCE(SUM(reason != '-'), 0) AS filtered
+            FROM ({category_filter_sql(len(whitelist), len(blacklist))})
+            """,
+            (*whitelist, *blacklist, date.strftime("%Y-%m-%d")),
+        ).fetchone()
+        return row["chosen"], row["filtered"]
+
+    def search(
+        self,
+        query: str,
+        date_from: datetime | None = None,
+        date_until: datetime | None = None,
+        categories: Iterable[str] | None = None,
+        limit=20,
+        raw=False,
+        highlight=("**", "**"),
+    ) -> list[SearchHit]:
+        """
+        在标题、摘要及其翻译中全文检索, 按bm25相关度排序(标题的权重高于摘要)。
+        分词器为unicode61, 连续的中文会被视为一个词, 因此翻译字段只适合用前缀查询(如"大语言*")
+
+        Args:
+            query (str): 查询关键词, 各词之间为AND
+            date_from (datetime | None, optional): 首次公布日期的下界(含). Defaults to None.
+            date_until (datetime | None, optional): 首次公布日期的上界(含). Defaults to None.
+            categories (Iterable[str] | None, optional): 分类, 文章至少属于其中一个. Defaults to None.
+            limit (int, optional): 最多返回的结果数. Defaults to 20.
+            raw (bool, optional): `query`是否为FTS5查询语法(支持OR/NOT/NEAR/前缀等), 否则按`fts_query`转换. Defaults to False.
+            highlight (tuple[str, str], optional): 片段中命中词前后的标记. Defaults to ("**", "**").
+
+        Returns:
+            list[SearchHit]: 检索结果
+        """
+        conditions = ["papers_fts MATCH ?"]
+        params: list = [query if raw else fts_query(query)]
+        if date_from is not None:
+            conditions.append("papers.first_announced_date >= ?")
+            params.append(date_from.strftime("%Y-%m-%d"))
+        if date_until is not None:
+            conditions.append("papers.first_announced_date <= ?")
+            params.append(date_until.strftime("%Y-%m-%d"))
+        if categories is not None:
+            categories = list(categories)
+            conditions.append(
+                "EXISTS (SELECT 1 FROM paper_categories c WHERE c.url = papers.url "
+                f"AND c.category IN ({','.join('?' * len(categories))}))"
             )
-            return cursor.fetchall()
+            params.extend(categories)
+        cursor = self.reader().execute(
+            f"""
+            SELECT papers.*,
+                bm25(papers_fts, 10.0, 1.0, 10.0, 1.0) AS score,
+                snippet(papers_fts, -1, ?, ?, '...', 24) AS snippet
+            FROM papers_fts JOIN papers ON papers.rowid = papers_fts.rowid
+            WHERE {" AND ".join(conditions)}
+            ORDER BY score
+            LIMIT ?
+            """,
+            (*highlight, *params, limit),
+        )
+        return [SearchHit(Paper.from_row(row), row["score"], row["snippet"]) for row in cursor]
 
-    def fetch_all(self) -> list[Paper]:
-        with self.conn:
-            cursor = self.conn.execute(
-                """
-                SELECT * FROM papers ORDER BY url DESC
-                """
+    def rebuild_search_index(self):
+        """
+        重建全文索引。外部内容表通过rowid(即papers.id)关联papers, 索引与papers不一致时调用本方法
+        """
+        with self._transaction():
+            self.conn.execute("INSERT INTO papers_fts (papers_fts) VALUES ('rebuild')")
+
+    @staticmethod
+    def _iter_rows(cursor: sqlite3.Cursor, batch_size: int) -> Iterator[PaperRow]:
+        columns = {column[0]: i for i, column in enumerate(cursor.description)}
+        while rows := cursor.fetchmany(batch_size):
+            for row in rows:
+                yield PaperRow(columns, row)
+
+    def iter_papers(
+        self, date: datetime | None = None, columns: Iterable[str] | None = None, batch_size=1000
+    ) -> Iterator[PaperRow]:
+        """
+        按url降序流式读取文章, 每次从数据库取`batch_size`行, 内存占用与表的大小无关
+
+        Args:
+            date (datetime | None, optional): 只读取这一天首次公布的文章, None表示全部. Defaults to None.
+            columns (Iterable[str] | None, optional): 读取的列, None表示`Paper`的全部字段. Defaults to None.
+            batch_size (int, optional): 每批读取的行数. Defaults to 1000.
+
+        Yields:
+            PaperRow: 只包含`columns`的惰性行, 需要完整的`Paper`时调用`to_paper`
+        """
+        columns = [field.name for field in fields(Paper)] if columns is None else list(columns)
+        if unknown := set(columns) - {field.name for field in fields(Paper)} - {"update_time", "content_hash"}:
+            raise ValueError(f"Unknown columns: {unknown}")
+        sql = f"SELECT {', '.join(columns)} FROM papers"
+        params = ()
+        if date is not None:
+            sql += " WHERE first_announced_date = ?"
+            params = (date.strftime("%Y-%m-%d"),)
+        cursor = self.reader().cursor()
+        cursor.row_factory = None
+        cursor.execute(f"{sql} ORDER BY url DESC", params)
+        yield from self._iter_rows(cursor, batch_size)
+
+    def iter_filtered_papers_on_date(
+        self, date: datetime, whitelist: Iterable[str], blacklist: Iterable[str], batch_size=1000
+    ) -> Iterator[PaperRow]:
+        """
+        `fetch_filtered_papers_on_date`的流式版本, 入选的文章在前
+
+        Yields:
+            PaperRow: 包含`Paper`的全部字段, 以及筛选结果`reason`
+        """
+        whitelist, blacklist = list(whitelist), list(blacklist)
+        cursor = self.reader().cursor()
+        cursor.row_factory = None
+        cursor.execute(
+            f"SELECT * FROM ({category_filter_sql(len(whitelist), len(blacklist))}) ORDER BY reason != '-', url DESC",
+            (*whitelist, *blacklist, date.strftime("%Y-%m-%d")),
+        )
+        yield from self._iter_rows(cursor, batch_size)
+
+    def fetch_all(self, compact=False, lazy_abstract=True) -> list[Paper] | list[CompactPaper]:
+        """
+        Args:
+            compact (bool, optional): 是否返回内存紧凑的`CompactPaper`, 适合一次性读取整个数据库. Defaults to False.
+            lazy_abstract (bool, optional): `compact`时是否延迟到访问时才读取摘要及其翻译. Defaults to True.
+        """
+        if compact:
+            return self.fetch_all_compact(lazy_abstract)
+        cursor = self.reader().execute(
+            """
+            SELECT * FROM papers ORDER BY url DESC
+            """
+        )
+        return cursor.fetchall()
+
+    def fetch_all_compact(self, lazy_abstract=True, batch_size=10000) -> list[CompactPaper]:
+        columns = "url, title, authors, comments, title_translated, categories, first_submitted_date, first_announced_date"
+        if not lazy_abstract:
+            columns += ", abstract, abstract_translated"
+        cursor = self.reader().cursor()
+        cursor.row_factory = None
+        cursor.execute(f"SELECT {columns} FROM papers ORDER BY url DESC")
+        loader = self.fetch_abstract if lazy_abstract else None
+        papers = []
+        while rows := cursor.fetchmany(batch_size):
+            for url, title, authors, comments, title_translated, categories, submitted, announced, *abstract in rows:
+                papers.append(
+                    CompactPaper(
+                        url=url,
+                        title=title,
+                        authors=authors,
+                        comments=comments,
+                        title_translated=title_translated,
+                        categories=categories,
+                        first_submitted_date=submitted,
+                        first_announced_date=announced,
+                        loader=loader,
+                        **dict(zip(("abstract", "abstract_translated"), abstract)),
+                    )
+                )
+        return papers
+
+    def fetch_abstract(self, url: str) -> tuple[str, str | None]:
+        """
+        读取一篇文章的摘要及其翻译, 作为`CompactPaper`的延迟加载函数
+        """
+        cursor = self.reader().cursor()
+        cursor.row_factory = None
+        return cursor.execute("SELECT abstract, abstract_translated FROM papers WHERE url = ?", (url,)).fetchone()
+
+    def iter_date_columns(
+        self, batch_size=100_000, announced_from: datetime | None = None
+    ) -> Iterator[tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]]:
+        """
+        按url升序(即从旧到新)分批读取日期相关的列及标题, 用于批量重新推断首次公布日期
+
+        Args:
+            announced_from (datetime | None, optional): 只读取首次公布日期不早于该日期的文章. Defaults to None.
+
+        Yields:
+            tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]: 一批的url和标题(object数组),
+                首次提交日期和首次公布日期(datetime64[D]数组)
+        """
+        cursor = self.reader().cursor()
+        cursor.row_factory = None
+        sql, params = "SELECT url, title, first_submitted_date, first_announced_date FROM papers", ()
+        if announced_from is not None:
+            sql, params = sql + " WHERE first_announced_date >= ?", (announced_from.strftime("%Y-%m-%d"),)
+        cursor.execute(sql + " ORDER BY url", params)
+        while rows := cursor.fetchmany(batch_size):
+            urls, titles, submitted, announced = zip(*rows)
+            yield (
+                np.array(urls, dtype=object),
+                np.array(titles, dtype=object),
+                np.array(submitted, dtype="datetime64[D]"),
+                np.array(announced, dtype="datetime64[D]"),
+            )
+
+    def update_announced_dates(self, urls: np.ndarray, announced_dates: np.ndarray):
+        """
+        只更新首次公布日期一列, 不改动其他字段和`update_time`
+        """
+        with self._transaction():
+            self.conn.executemany(
+                "UPDATE papers SET first_announced_date = ? WHERE url = ?",
+                zip(announced_dates.astype(str).tolist(), urls.tolist()),
             )
-            return cursor.fetchall()
 
     def newest_update_time(self) -> datetime:
         """
         最新更新时间是“上一次爬取最新论文的时间”
         由于数据库可能补充爬取过去的论文，所以先选最新论文，再从其中选最新的爬取时间
         """
-        with self.conn:
-            cursor = self.conn.execute(
-                """
-                SELECT MAX(update_time) as max_updated_time
-                FROM papers
-                WHERE first_announced_date = (SELECT MAX(first_announced_date) FROM papers)
-                """
-            )
+        sql, params = self.HOT_QUERIES["newest_update_time"]
+        cursor = self.reader().execute(sql, params)
         time = cursor.fetchone()["max_updated_time"].split(".")[0]
         return datetime.strptime(time, "%Y-%m-%d %H:%M:%S")
 
-    async def translate_missing(self, langto="zh-CN"):
-        with self.conn:
-            cursor = self.conn.execute(
-                "SELECT url, title, abstract FROM papers WHERE title_translated IS NULL OR abstract_translated IS NULL"
+    def start_crawl_job(self, fingerprint: str, url: str, total: int):
+        """
+        开始一个新的爬取任务, 会清除同一指纹下之前的页面记录
+        """
+        with self._transaction():
+            self.conn.execute("DELETE FROM crawl_pages WHERE fingerprint = ?", (fingerprint,))
+            self.conn.execute(
+                "INSERT OR REPLACE INTO crawl_jobs (fingerprint, url, total, status, update_time) VALUES (?, ?, ?, ?, ?)",
+                (fingerprint, url, total, "running", datetime.now(UTC).replace(tzinfo=None)),
+            )
+
+    def unfinished_crawl_job(self, fingerprint: str) -> tuple[int, set[int]] | None:
+        """
+        获取未完成的爬取任务
+
+        Returns:
+            tuple[int, set[int]] | None: 结果总数, 以及已完成页面的起始序号; 没有未完成的任务时返回None
+        """
+        conn = self.reader()
+        job = conn.execute(
+            "SELECT total FROM crawl_jobs WHERE fingerprint = ? AND status = 'running'", (fingerprint,)
+        ).fetchone()
+        if job is None:
+            return None
+        cursor = conn.execute(
+            "SELECT start FROM crawl_pages WHERE fingerprint = ? AND status = 'done'", (fingerprint,)
+        )
+        return job["total"], {row["start"] for row in cursor}
+
+    def save_crawl_page(self, fingerprint: str, start: int, papers: list[Paper] | None, error: str | None = None):
+        """
+        记录一个页面的结果: 先把页面中的文章写入数据库, 再标记该页面已完成。
+        `papers`为None表示该页面失败, 恢复时需要重新请求; 两步之间中断时该页面会被重新请求, 重复写入没有副作用
+        """
+        if papers is not None:
+            self.add_papers(papers)
+        with self._transaction():
+            self.conn.execute(
+                "INSERT OR REPLACE INTO crawl_pages (fingerprint, start, status, error) VALUES (?, ?, ?, ?)",
+                (fingerprint, start, "failed" if papers is None else "done", error),
+            )
+            self.conn.execute(
+                "UPDATE crawl_jobs SET update_time = ? WHERE fingerprint = ?",
+                (datetime.now(UTC).replace(tzinfo=None), fingerprint),
+            )
+
+    def finish_crawl_job(self, fingerprint: str):
+        """
+        标记爬取任务完成, 并删除页面记录
+        """
+        with self._transaction():
+            self.conn.execute("DELETE FROM crawl_pages WHERE fingerprint = ?", (fingerprint,))
+            self.conn.execute(
+                "UPDATE crawl_jobs SET status = 'done', update_time = ? WHERE fingerprint = ?",
+                (datetime.now(UTC).replace(tzinfo=None), fingerprint),
+            )
+
+    def update_translations(self, rows: list[tuple[str, str | None, str | None]]):
+        """
+        在一个事务中批量写入翻译
+
+        Args:
+            rows (list[tuple[str, str | None, str | None]]): (url, title_translated, abstract_translated)
+        """
+        with self._transaction():
+            self.conn.executemany(
+                "UPDATE papers SET title_translated = ?, abstract_translated = ? WHERE url = ?",
+                [(title_translated, abstract_translated, url) for url, title_translated, abstract_translated in rows],
             )
-            papers = cursor.fetchall()
-
-        async def worker(url, title, abstract):
-            title_translated = await async_translate(title, langto=langto) if title else None
-            abstract_translated = await async_translate(abstract, langto=langto) if abstract else None
-            with self.conn:
-                self.conn.execute(
-                    "UPDATE papers SET title_translated = ?, abstract_translated = ? WHERE url = ?",
-                    (title_translated, abstract_translated, url),
+
+    def fetch_untranslated(self) -> list[sqlite3.Row]:
+        """
+        获取标题或摘要尚未翻译的文章
+
+        Returns:
+            list[sqlite3.Row]: (url, title, abstract)
+        """
+        return self.reader().execute(
+            "SELECT url, title, abstract FROM papers WHERE title_translated IS NULL OR abstract_translated IS NULL"
+        ).fetchall()
+
+    async def translate_missing(self, langto="zh-CN", chunk_size=200):
+        """
+        翻译所有缺少翻译的文章, 每`chunk_size`篇的标题和摘要批量翻译后写入一次, 所有批次共享同一个aiohttp会话
+        """
+        async with AsyncPaperDatabase(self) as adb, aiohttp.ClientSession(trust_env=True) as session:
+            papers = await adb.run(self.fetch_untranslated)
+
+            async def worker(chunk):
+                texts = [text or None for _, title, abstract in chunk for text in (title, abstract)]
+                translated = await async_translate_batch(texts, langto=langto, session=session)
+                await adb.update_translations(
+                    [(url, *translated[2 * i : 2 * i + 2]) for i, (url, _, _) in enumerate(chunk)]
                 )
 
-        await asyncio.gather(*[worker(url, title, abstract) for url, title, abstract in papers])
+            await asyncio.gather(*[worker(papers[i : i + chunk_size]) for i in range(0, len(papers), chunk_size)])
+
+
+class BatchedWriter:
+    """
+    异步的批量写入任务: 协程把待写入的行放入队列, 后台任务把它们合并成批, 每批在线程中调用一次`write`(即一个事务)。
+    队列中积累了`batch_size`行, 或者距第一行入队已过`flush_interval`秒时写入一批; 退出上下文时写入剩余的行
+
+    用法:
+        async with BatchedWriter(paper_db.update_translations) as writer:
+            await writer.put(row)
+    """
+
+    def __init__(self, write, batch_size=200, flush_interval=0.5, executor=None):
+        """
+        Args:
+            write (Callable[[list], None]): 写入一批行的同步函数, 需要可以在其他线程中调用
+            batch_size (int, optional): 每批的最大行数. Defaults to 200.
+            flush_interval (float, optional): 一批的最长等待秒数. Defaults to 0.5.
+            executor (concurrent.futures.Executor | None, optional): 执行`write`的线程池, None表示事件循环的默认线程池. Defaults to None.
+        """
+        self.write = write
+        self.executor = executor
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.queue: asyncio.Queue | None = None
+        self.task: asyncio.Task | None = None
+
+    async def __aenter__(self):
+        self.queue = asyncio.Queue(maxsize=self.batch_size * 4)
+        self.task = asyncio.create_task(self._run())
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self._put(None)
+        await self.task
+
+    async def put(self, row):
+        await self._put(row)
+
+    async def _put(self, row):
+        """
+        把一行放入队列。写入任务失败时抛出其异常, 即使此时队列已满、正在等待空位也不会无限等待
+        """
+        if self.task.done():
+            self.task.result()
+        if not self.queue.full():
+            self.queue.put_nowait(row)
+            return
+        put = asyncio.ensure_future(self.queue.put(row))
+        try:
+            await asyncio.wait((put, self.task), return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            if not put.done():
+                put.cancel()
+        if not put.done() or put.cancelled():
+            self.task.result()
+            raise RuntimeError("BatchedWriter stopped before the row was queued")
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        closed = False
+        while not closed:
+            row = await self.queue.get()
+            if row is None:
+                break
+            batch = [row]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    row = await asyncio.wait_for(self.queue.get(), timeout=max(0, deadline - loop.time()))
+                except asyncio.TimeoutError:
+                    break
+                if row is None:
+                    closed = True
+                    break
+                batch.append(row)
+            await loop.run_in_executor(self.executor, self.write, batch)
+            self.written += len(batch)
+
+
+class AsyncPaperDatabase:
+    """
+    `PaperDatabase`的异步外观: 所有查询和写入都在一个专用的数据库线程中执行, 事件循环不会因磁盘I/O阻塞。
+    单线程保证了同一时刻只有一个写事务, 也让该线程的只读连接可以一直复用。
+
+    作为异步上下文管理器使用时, `update_translations`的行会合并成批写入(见`BatchedWriter`), 退出时写入剩余的行,
+    并关闭数据库线程; 不在上下文中时每次调用直接写入一批, 用完后需要调用`close`。
+    数据库线程在需要时才创建, 关闭后再次使用会重新创建, 因此可以在多次`asyncio.run`之间复用
+
+    用法:
+        async with AsyncPaperDatabase(paper_db) as adb:
+            await adb.add_papers(papers)
+            await adb.update_translations([(url, title_translated, abstract_translated)])
+    """
+
+    def __init__(self, paper_db: PaperDatabase, batch_size=200, flush_interval=0.5):
+        """
+        Args:
+            paper_db (PaperDatabase): 被包装的数据库
+            batch_size (int, optional): 翻译每批写入的最大行数. Defaults to 200.
+            flush_interval (float, optional): 翻译一批的最长等待秒数. Defaults to 0.5.
+        """
+        self.db = paper_db
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.executor: ThreadPoolExecutor | None = None
+        self.writer: BatchedWriter | None = None
+
+    def _executor(self) -> ThreadPoolExecutor:
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="paper-db")
+        return self.executor
+
+    async def __aenter__(self):
+        self.writer = BatchedWriter(
+            self.db.update_translations, self.batch_size, self.flush_interval, executor=self._executor()
+        )
+        await self.writer.__aenter__()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        writer, self.writer = self.writer, None
+        try:
+            await writer.__aexit__(exc_type, exc, tb)
+        finally:
+            self.close()
+
+    async def run(self, fn, *args, **kwargs):
+        """
+        在数据库线程中执行`fn(*args, **kwargs)`, 用于没有专门包装的`PaperDatabase`方法
+        """
+        return await asyncio.get_running_loop().run_in_executor(self._executor(), partial(fn, *args, **kwargs))
+
+    async def add_papers(self, papers: Iterable[Paper], overwrite=True) -> UpsertCounts:
+        return await self.run(self.db.add_papers, list(papers), overwrite)
+
+    async def exists(self, urls: Iterable[str]) -> set[str]:
+        """
+        返回`urls`中已经存在于数据库的url
+        """
+        return await self.run(self.db.known_urls, list(urls))
+
+    async def count_new_urls(self, urls: Iterable[str]) -> int:
+        return await self.run(self.db.count_new_urls, list(urls))
+
+    async def count_new_papers(self, papers: Iterable[Paper]) -> int:
+        return await self.count_new_urls(paper.url for paper in papers)
+
+    async def update_translations(self, rows: Iterable[tuple[str, str | None, str | None]]):
+        """
+        写入翻译, 在上下文中时只是加入批量写入的队列, 退出上下文时保证全部写入
+
+        Args:
+            rows (Iterable[tuple[str, str | None, str | None]]): (url, title_translated, abstract_translated)
+        """
+        if self.writer is None:
+            await self.run(self.db.update_translations, list(rows))
+        else:
+            for row in rows:
+                await self.writer.put(row)
+
+    def close(self):
+        """
+        关闭数据库线程, 等待已提交的操作完成
+        """
+        executor, self.executor = self.executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
 
 
 class PaperExporter:
@@ -446,6 +1635,18 @@ class PaperExporter:
                 chosen_paper_records.append(PaperRecord(paper, "-"))
         return chosen_paper_records, filtered_paper_records
 
+    def fetch_records(self, date: datetime) -> tuple[list[PaperRecord], list[PaperRecord]]:
+        """
+        获取某一天的文章并按分类筛选, 与`filter_papers`结果一致, 但筛选在数据库中完成
+        """
+        chosen_paper_records = []
+        filtered_paper_records = []
+        for paper, reason in self.db.fetch_filtered_papers_on_date(
+            date, self.categories_whitelist, self.categories_blacklist
+        ):
+            (chosen_paper_records if reason == "-" else filtered_paper_records).append(PaperRecord(paper, reason))
+        return chosen_paper_records, filtered_paper_records
+
     def to_markdown(self, output_dir="./output_llms", filename_format="%Y-%m-%d", metadata=None):
         output_dir = Path(output_dir)
         output_dir.mkdir(exist_ok=True, parents=True)
@@ -468,8 +1669,7 @@ class PaperExporter:
             current_filename = current.strftime(filename_format)
 
             with open(output_dir / f"{current_filename}.md", "w", encoding="utf-8") as file:
-                papers = self.db.fetch_papers_on_date(current)
-                chosen_records, filtered_records = self.filter_papers(papers)
+                chosen_records, filtered_records = self.fetch_records(current)
                 papers_str = f"# 论文全览：{current_filename}\n\n共有{len(chosen_records)}篇相关领域论文\n\n"
 
                 chosen_dict = defaultdict(list)
@@ -553,13 +1753,19 @@ class PaperExporter:
                 if header:
                     writer.writerow(headers)
 
-                papers = self.db.fetch_papers_on_date(current)
-                chosen_records, filtered_records = self.filter_papers(papers)
-                for record in chosen_records + filtered_records:
+                n_chosen = n_filtered = 0
+                for row in self.db.iter_filtered_papers_on_date(
+                    current, self.categories_whitelist, self.categories_blacklist
+                ):
+                    record = PaperRecord(row, row.reason)
                     writer.writerow([fn(record) for fn in csv_table.values()])
+                    if row.reason == "-":
+                        n_chosen += 1
+                    else:
+                        n_filtered += 1
 
                 self.console.log(
-                    f"[bold green]Output {current_filename}.csv completed. {len(chosen_records)} papers chosen, {len(filtered_records)} papers filtered"
+                    f"[bold green]Output {current_filename}.csv completed. {n_chosen} papers chosen, {n_filtered} papers filtered"
                 )
 
 
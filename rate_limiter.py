@@ -0,0 +1,167 @@
+import asyncio
+import random
+import time
+
+from collections import deque
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from email.utils import parsedate_to_datetime
+
+# 这些状态码表示服务端在限流或暂时过载, 需要降速而不是简单重试
+THROTTLE_STATUS = (429, 503)
+
+
+@dataclass
+class FetchFailure:
+    """
+    多次重试后仍然失败的页面请求记录, 用于代替`None`返回给调用者
+
+    Attributes:
+        start (int): 页面的起始序号
+        url (str): 请求的url
+        status (int | None): 最后一次响应的HTTP状态码, 连接错误时为None
+        error (str): 最后一次失败的原因
+        attempts (int): 总共尝试的次数
+    """
+
+    start: int
+    url: str
+    status: int | None
+    error: str
+    attempts: int
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """
+    解析`Retry-After`响应头, 支持秒数和HTTP日期两种格式
+
+    Returns:
+        float | None: 需要等待的秒数, 无法解析时返回None
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=UTC)
+    return max(0.0, (retry_at - datetime.now(UTC)).total_seconds())
+
+
+def backoff_delay(attempt: int, base: float = 1.0, cap: float = 60.0) -> float:
+    """
+    带完全抖动(full jitter)的指数退避, 第`attempt`次重试等待[0, min(cap, base * 2^attempt))秒
+    """
+    return random.uniform(0, min(cap, base * 2**attempt))
+
+
+class TokenBucket:
+    """
+    令牌桶, 以`rate`个/秒的速度补充令牌, 最多积累`capacity`个, 用于限制请求的平均速率和突发量
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        while True:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class RateController:
+    """
+    arxiv请求的速率控制层:
+        - 令牌桶限制请求速率
+        - AIMD调整并发数: 连续成功一个窗口(等于当前并发数)后并发+1, 遇到429/503时并发减半;
+          同时在途的一批请求往往一起被限流, 因此每个`throttle_cooldown`秒内最多减半一次
+        - 遇到限流时按`Retry-After`(若有)暂停所有请求
+
+    不持有任何绑定事件循环的对象, 因此可以在多次`asyncio.run`之间复用并保留学到的并发数
+    """
+
+    def __init__(
+        self,
+        requests_per_second: float = 2.0,
+        burst: int = 4,
+        initial_concurrency: int = 2,
+        max_concurrency: int = 8,
+        min_concurrency: int = 1,
+        throttle_cooldown: float = 5.0,
+    ):
+        self.bucket = TokenBucket(requests_per_second, burst)
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.concurrency = max(min_concurrency, min(initial_concurrency, max_concurrency))
+        self.in_flight = 0
+        self.successes = 0
+        self.throttle_cooldown = throttle_cooldown
+        self.last_decrease = float("-inf")
+        self.blocked_until = 0.0
+        self._waiters: deque[asyncio.Future] = deque()
+
+    def _wake(self):
+        free = self.concurrency - self.in_flight
+        while free > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
+
+    async def __aenter__(self):
+        while self.in_flight >= self.concurrency:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                self._wake()
+                raise
+        self.in_flight += 1
+        try:
+            while (delay := self.blocked_until - time.monotonic()) > 0:
+                await asyncio.sleep(delay)
+            await self.bucket.acquire()
+        except BaseException:
+            self.in_flight -= 1
+            self._wake()
+            raise
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.in_flight -= 1
+        self._wake()
+
+    def on_success(self):
+        self.successes += 1
+        if self.successes >= self.concurrency:
+            self.successes = 0
+            if self.concurrency < self.max_concurrency:
+                self.concurrency += 1
+                self._wake()
+
+    def on_throttle(self, retry_after: float | None = None):
+        now = time.monotonic()
+        self.successes = 0
+        if now - self.last_decrease >= self.throttle_cooldown:
+            self.concurrency = max(self.min_concurrency, self.concurrency // 2)
+            self.last_decrease = now
+        if retry_after:
+            self.blocked_until = max(self.blocked_until, now + retry_after)
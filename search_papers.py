@@ -0,0 +1,47 @@
+import argparse
+
+from datetime import datetime
+
+from rich.console import Console
+from rich.markup import escape
+
+from paper import PaperDatabase
+
+# 片段中命中词的标记, 选用不会出现在正文中的控制字符, 转义后再替换为rich的样式
+HIGHLIGHT = ("\x02", "\x03")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="在papers.db中全文检索论文")
+    parser.add_argument("query", type=str, help='关键词(如"language model"), 各词之间为AND')
+    parser.add_argument("--db", type=str, default="papers.db", help="数据库路径")
+    parser.add_argument("--from", dest="date_from", type=str, default=None, help="首次公布日期下界(格式: YYYY-MM-DD)")
+    parser.add_argument("--until", dest="date_until", type=str, default=None, help="首次公布日期上界(格式: YYYY-MM-DD)")
+    parser.add_argument("--category", type=str, default=None, help='分类列表，用逗号分隔(如"cs.CL,cs.AI")')
+    parser.add_argument("--limit", type=int, default=20, help="最多显示的结果数")
+    parser.add_argument("--raw", action="store_true", help="使用FTS5查询语法(OR/NOT/NEAR/前缀*)")
+    args = parser.parse_args()
+
+    console = Console()
+    paper_db = PaperDatabase(args.db)
+    hits = paper_db.search(
+        args.query,
+        date_from=datetime.strptime(args.date_from, "%Y-%m-%d") if args.date_from else None,
+        date_until=datetime.strptime(args.date_until, "%Y-%m-%d") if args.date_until else None,
+        categories=[cat.strip() for cat in args.category.split(",")] if args.category else None,
+        limit=args.limit,
+        raw=args.raw,
+        highlight=HIGHLIGHT,
+    )
+    for i, hit in enumerate(hits, 1):
+        paper = hit.paper
+        snippet = escape(hit.snippet).replace(HIGHLIGHT[0], "[bold yellow]").replace(HIGHLIGHT[1], "[/bold yellow]")
+        console.print(
+            f"[bold]{i}. {escape(paper.title)}[/bold] [dim]({paper.first_announced_date.strftime('%Y-%m-%d')}, "
+            f"{escape(','.join(paper.categories))}, {hit.score:.2f})[/dim]\n   {paper.url}\n   {snippet}\n"
+        )
+    console.print(f"[bold green]{len(hits)} papers found.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,391 @@
+"""
+arxiv搜索结果页面(https://arxiv.org/search/advanced)的解析后端。
+
+- `LxmlSearchParser`: 基于lxml的XPath解析, 速度快, 需要安装lxml
+- `SoupSearchParser`: 基于BeautifulSoup + html.parser的纯Python解析, 作为后备
+
+两个后端提取完全相同的字段, 返回可pickle的`SearchEntry`, tests/test_search_parser.py在tests/pages下保存的页面上
+检查两者的一致性, 也可以用`python search_parser.py page1.html page2.html ...`检查其他页面。
+
+下面是一个搜索结果的例子
+<li class="arxiv-result">
+    <div class="is-marginless">
+        <p class="list-title is-inline-block">
+            <a href="https://arxiv.org/abs/physics/9403001">arXiv:physics/9403001</a>
+            <span>&nbsp;[<a href="https://arxiv.org/pdf/physics/9403001">pdf</a>, <a
+                    href="https://arxiv.org/ps/physics/9403001">ps</a>, <a
+                    href="https://arxiv.org/format/physics/9403001">other</a>]&nbsp;</span>
+        </p>
+        <div class="tags is-inline-block">
+            <span class="tag is-small is-link tooltip is-tooltip-top" data-tooltip="Popular Physics">
+                physics.pop-ph</span>
+            <span class="tag is-small is-grey tooltip is-tooltip-top"
+                data-tooltip="High Energy Physics - Theory">hep-th</span>
+        </div>
+        <div class="is-inline-block" style="margin-left: 0.5rem">
+            <div class="tags has-addons">
+                <span class="tag is-dark is-size-7">doi</span>
+                <span class="tag is-light is-size-7">
+                    <a class="" href="https://doi.org/10.1063/1.2814991">10.1063/1.2814991 <i
+                            class="fa fa-external-link" aria-hidden="true"></i></a>
+                </span>
+            </div>
+        </div> 
+    </div>
+    <p class="title is-5 mathjax">
+        Desperately Seeking Superstrings
+    </p>
+    <p class="authors">
+        <span class="has-text-black-bis has-text-weight-semibold">Authors:</span>
+            <a href="/search/?searchtype=author&amp;query=Ginsparg%2C+P">Paul Ginsparg</a>, <a href="/search/?searchtype=author&amp;query=Glashow%2C+S">Sheldon Glashow</a> 
+    </p> 
+    <p class="abstract mathjax">
+        <span class="has-text-black-bis has-text-weight-semibold">Abstract</span>: 
+        
+        <span class="abstract-short has-text-grey-dark mathjax" id="physics/9403001v1-abstract-short"
+            style="display: inline;"> We provide a detailed analysis of the problems and prospects of superstring theory c.
+        1986, anticipating much of the progress of the decades to follow. </span>
+
+        <span class="abstract-full has-text-grey-dark mathjax" id="physics/9403001v1-abstract-full"
+            style="display: none;"> We provide a detailed analysis of the problems and prospects of
+        superstring theory c. 1986, anticipating much of the progress of the decades to follow. 
+        <a class="is-size-7" style="white-space: nowrap;"
+                onclick="document.getElementById('physics/9403001v1-abstract-full').style.display = 'none'; document.getElementById('physics/9403001v1-abstract-short').style.display = 'inline';">△ Less</a>
+        </span>
+    </p> 
+    <p class="is-size-7"><span class="has-text-black-bis has-text-weight-semibold">Submitted</span>
+        25 April, 1986; <span class="has-text-black-bis has-text-weight-semibold">originally
+        announced</span> March 1994. </p> 
+    <p class="comments is-size-7">
+        <span class="has-text-black-bis has-text-weight-semibold">Comments:</span>
+        <span class="has-text-grey-dark mathjax">originally appeared as a Reference Frame in Physics
+            Today, May 1986</span>
+    </p> 
+    <p class="comments is-size-7">
+        <span class="has-text-black-bis has-text-weight-semibold">Journal ref:</span> Phys.Today
+        86N5 (1986) 7-9 </p> 
+</li>
+"""
+
+import re
+
+from datetime import datetime
+from typing import NamedTuple
+
+from bs4 import BeautifulSoup, Comment, NavigableString, Tag
+
+try:
+    import lxml.html
+except ImportError:  # lxml是可选依赖
+    lxml = None
+
+
+class SearchEntry(NamedTuple):
+    """
+    一条搜索结果, 字段与`Paper`的构造参数一一对应
+    """
+
+    url: str
+    title: str
+    first_submitted_date: datetime
+    categories: list[str]
+    authors: str
+    abstract: str
+    comments: str
+
+
+def parse_total(header: str) -> int:
+    """
+    解析结果总数, 形如"Showing 1–50 of 2,542,002 results"或"Sorry, your query returned no results"
+    """
+    if "Sorry" in header:
+        return 0
+    return int(header[header.find("of") + 3 : header.find("results")].replace(",", ""))
+
+
+def parse_submitted_date(date: str) -> datetime:
+    """
+    解析首次提交日期, 参数为去掉空白后拼接的日期段落文本
+    """
+    if "v1" in date:
+        # Submitted9 August, 2024; v1submitted 8 August, 2024; originally announced August 2024.
+        # 注意空格会被吞掉，这里我们要找最早的提交日期
+        v1 = date.find("v1submitted")
+        date = date[v1 + 12 : date.find(";", v1)]
+    else:
+        # Submitted8 August, 2024; originally announced August 2024.
+        # 注意空格会被吞掉
+        submit_date = date.find("Submitted")
+        date = date[submit_date + 9 : date.find(";", submit_date)]
+    return datetime.strptime(date, "%d %B, %Y")
+
+
+class SearchPageParser:
+    """
+    搜索结果页面解析后端的接口
+    """
+
+    name = ""
+
+    def parse(self, content: str) -> tuple[int, list[SearchEntry]]:
+        """
+        Args:
+            content (str): 网页内容
+
+        Returns:
+            tuple[int, list[SearchEntry]]: 结果总数, 以及本页的搜索结果
+
+        Raises:
+            ValueError: 页面不是搜索结果页面(例如维护页面)或者无法解析
+        """
+        raise NotImplementedError
+
+
+class SoupSearchParser(SearchPageParser):
+    name = "bs4"
+
+    def parse(self, content):
+        soup = BeautifulSoup(content, "html.parser")
+        header = soup.select("#main-container > div.level.is-marginless > div.level-left > h1")
+        if not header:
+            raise ValueError("Unexpected search page: no result header found")
+        total = parse_total(header[0].text)
+        if total == 0:
+            return 0, []
+
+        entries = []
+        for result in soup.find_all("li", {"class": "arxiv-result"}):
+            url_tag = result.find("a")
+            url = url_tag["href"] if url_tag else "No link"
+
+            title_tag = result.find("p", class_="title")
+            title = self.parse_text(title_tag) if title_tag else "No title"
+
+            date_tag = result.find("p", class_="is-size-7")
+            date = date_tag.get_text(strip=True) if date_tag else "No date"
+
+            category_tag = result.find_all("span", class_="tag")
+            categories = [
+                category.get_text(strip=True) for category in category_tag if "tooltip" in category.get("class")
+            ]
+
+            authors_tag = result.find("p", class_="authors")
+            authors = authors_tag.get_text(strip=True)[len("Authors:") :] if authors_tag else "No authors"
+
+            summary_tag = result.find("span", class_="abstract-full")
+            abstract = self.parse_text(summary_tag) if summary_tag else "No summary"
+
+            comments_tag = result.find("p", class_="comments")
+            comments = comments_tag.get_text(strip=True)[len("Comments:") :] if comments_tag else "No comments"
+
+            entries.append(
+                SearchEntry(
+                    url=url,
+                    title=title.strip(),
+                    first_submitted_date=parse_submitted_date(date),
+                    categories=categories,
+                    authors=authors,
+                    abstract=abstract.strip(),
+                    comments=comments,
+                )
+            )
+        return total, entries
+
+    @staticmethod
+    def parse_text(tag: Tag) -> str:
+        """解析搜索结果页面中的文本内容，处理HTML标签和特殊格式
+
+        提取纯文本内容，同时处理搜索高亮等特殊格式，跳过展开/收起控制标签。
+        其他未预料到的标签按其文本内容处理。
+
+        Args:
+            tag (bs4.element.Tag): BeautifulSoup解析的HTML标签
+
+        Returns:
+            str: 处理后的纯文本内容，已合并多余空白字符
+        """
+        string = ""
+        for child in tag.children:
+            if isinstance(child, Comment):
+                # 与lxml后端一致, 跳过HTML注释
+                continue
+            if isinstance(child, NavigableString):
+                string += re.sub(r"\s+", " ", child)
+            elif isinstance(child, Tag):
+                if child.name == "a" and ".style.display" in child.get("onclick", ""):
+                    continue
+                string += re.sub(r"\s+", " ", child.get_text(strip=False))
+        return string
+
+
+def _has_class(name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+class LxmlSearchParser(SearchPageParser):
+    name = "lxml"
+
+    _header = f"//*[@id='main-container']/div[{_has_class('level')}]/div[{_has_class('level-left')}]/h1"
+    _results = f"//li[{_has_class('arxiv-result')}]"
+    _title = f".//p[{_has_class('title')}]"
+    _date = f".//p[{_has_class('is-size-7')}]"
+    _categories = f".//span[{_has_class('tag')} and {_has_class('tooltip')}]"
+    _authors = f".//p[{_has_class('authors')}]"
+    _abstract = f".//span[{_has_class('abstract-full')}]"
+    _comments = f".//p[{_has_class('comments')}]"
+
+    def __init__(self):
+        if lxml is None:
+            raise ImportError("lxml is required for the lxml search parser")
+
+    def parse(self, content):
+        root = lxml.html.fromstring(content)
+        header = root.xpath(self._header)
+        if not header:
+            raise ValueError("Unexpected search page: no result header found")
+        total = parse_total(header[0].text_content())
+        if total == 0:
+            return 0, []
+
+        entries = []
+        for result in root.xpath(self._results):
+            url_tag = result.find(".//a")
+            url = url_tag.get("href") if url_tag is not None else "No link"
+
+            title_tag = self._first(result, self._title)
+            title = self.parse_text(title_tag) if title_tag is not None else "No title"
+
+            date_tag = self._first(result, self._date)
+            date = self.stripped_text(date_tag) if date_tag is not None else "No date"
+
+            categories = [self.stripped_text(tag) for tag in result.xpath(self._categories)]
+
+            authors_tag = self._first(result, self._authors)
+            authors = self.stripped_text(authors_tag)[len("Authors:") :] if authors_tag is not None else "No authors"
+
+            summary_tag = self._first(result, self._abstract)
+            abstract = self.parse_text(summary_tag) if summary_tag is not None else "No summary"
+
+            comments_tag = self._first(result, self._comments)
+            comments = (
+                self.stripped_text(comments_tag)[len("Comments:") :] if comments_tag is not None else "No comments"
+            )
+
+            entries.append(
+                SearchEntry(
+                    url=url,
+                    title=title.strip(),
+                    first_submitted_date=parse_submitted_date(date),
+                    categories=categories,
+                    authors=authors,
+                    abstract=abstract.strip(),
+                    comments=comments,
+                )
+            )
+        return total, entries
+
+    @staticmethod
+    def _first(element, xpath):
+        found = element.xpath(xpath)
+        return found[0] if found else None
+
+    @staticmethod
+    def _strings(element):
+        # 与BeautifulSoup的get_text一致, 只收集文本节点, 跳过注释
+        if isinstance(element.tag, str):
+            yield element.text or ""
+            for child in element:
+                yield from LxmlSearchParser._strings(child)
+                yield child.tail or ""
+
+    @staticmethod
+    def stripped_text(element) -> str:
+        """等价于BeautifulSoup的`get_text(strip=True)`"""
+        return "".join(string.strip() for string in LxmlSearchParser._strings(element))
+
+    @staticmethod
+    def parse_text(element) -> str:
+        """与`SoupSearchParser.parse_text`相同的规则: 合并空白, 跳过展开/收起控制标签"""
+        string = re.sub(r"\s+", " ", element.text or "")
+        for child in element:
+            if isinstance(child.tag, str) and not (child.tag == "a" and ".style.display" in child.get("onclick", "")):
+                string += re.sub(r"\s+", " ", "".join(LxmlSearchParser._strings(child)))
+            string += re.sub(r"\s+", " ", child.tail or "")
+        return string
+
+
+PARSERS = {parser.name: parser for parser in (LxmlSearchParser, SoupSearchParser)}
+
+
+def get_parser(name="auto") -> SearchPageParser:
+    """
+    获取解析后端, `auto`会在安装了lxml时使用lxml, 否则使用BeautifulSoup
+    """
+    if name == "auto":
+        name = "lxml" if lxml is not None else "bs4"
+    if name not in PARSERS:
+        raise ValueError(f"Unknown search parser: {name}, choose from {', '.join(PARSERS)} or auto")
+    return PARSERS[name]()
+
+
+_HEADER_RE = re.compile(r"<h1[^>]*>\s*((?:Showing|Sorry)[^<]*)</h1>")
+_RESULT_URL_RE = re.compile(r'<li class="arxiv-result">.*?<a href="([^"]+)"', re.S)
+
+
+def parse_search_ids(content: str) -> tuple[int, list[str]]:
+    """
+    只提取结果总数和每条结果的url, 不构建DOM, 用于增量更新时快速寻找新旧文章的分界。
+    配合隐藏摘要、每页200条的搜索页面使用
+
+    Returns:
+        tuple[int, list[str]]: 结果总数, 以及本页按顺序排列的url
+    """
+    header = _HEADER_RE.search(content)
+    if header is None:
+        raise ValueError("Unexpected search page: no result header found")
+    total = parse_total(header.group(1).replace("&ndash;", "–"))
+    if total == 0:
+        return 0, []
+    return total, _RESULT_URL_RE.findall(content)
+
+
+_worker_parsers: dict[str, SearchPageParser] = {}
+
+
+def parse_search_page(content: str, name: str = "auto") -> tuple[int, list[SearchEntry]]:
+    """
+    供`ProcessPoolExecutor`调用的解析入口: 每个工作进程只创建一次解析器,
+    返回值只包含结果总数和`SearchEntry`元组, 序列化回主进程的开销很小
+    """
+    if name not in _worker_parsers:
+        _worker_parsers[name] = get_parser(name)
+    return _worker_parsers[name].parse(content)
+
+
+if __name__ == "__main__":
+    """在保存下来的搜索结果页面上检查各解析后端的结果是否一致"""
+    import sys
+    import time
+
+    soup_parser, lxml_parser = SoupSearchParser(), LxmlSearchParser()
+    mismatches = 0
+    for path in sys.argv[1:]:
+        with open(path, encoding="utf-8") as f:
+            content = f.read()
+        results = {}
+        for parser in (soup_parser, lxml_parser):
+            begin = time.perf_counter()
+            results[parser.name] = parser.parse(content)
+            print(f"{path} [{parser.name}] {len(results[parser.name][1])} results in {time.perf_counter() - begin:.3f}s")
+        expected, actual = results["bs4"], results["lxml"]
+        if expected[0] != actual[0]:
+            mismatches += 1
+            print(f"{path}: total mismatch {expected[0]} != {actual[0]}")
+        for soup_entry, lxml_entry in zip(expected[1], actual[1]):
+            if soup_entry != lxml_entry:
+                mismatches += 1
+                print(f"{path}: mismatch\n  bs4:  {soup_entry}\n  lxml: {lxml_entry}")
+        if len(expected[1]) != len(actual[1]):
+            mismatches += 1
+            print(f"{path}: result count mismatch {len(expected[1])} != {len(actual[1])}")
+    sys.exit(1 if mismatches else 0)
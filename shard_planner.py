@@ -0,0 +1,77 @@
+from dataclasses import dataclass
+from datetime import datetime
+
+# arxiv搜索最多只能翻到第10000条结果, 超出的部分会被静默截断
+SEARCH_RESULT_LIMIT = 10000
+
+
+@dataclass(frozen=True)
+class SearchShard:
+    """
+    一次搜索的子查询: 首次公布日期在[month_from, month_until)的月份范围内, 且包含`keywords`中的至少一个。
+    announced_date_first只能按月可靠地过滤(见ArxivScraper.__init__), 因此子查询的日期范围也按月划分,
+    与ArxivScraper不分片时的搜索url使用相同的语义
+    """
+
+    month_from: datetime
+    month_until: datetime
+    keywords: tuple[str, ...]
+
+    @classmethod
+    def from_months(cls, month_from: datetime, month_until: datetime, keywords) -> "SearchShard":
+        """
+        由ArxivScraper按月的搜索范围构造, 得到的子查询与不分片时的搜索完全相同
+        """
+        return cls(month_from.replace(day=1), month_until.replace(day=1), tuple(keywords))
+
+    @property
+    def months(self) -> int:
+        return (self.month_until.year - self.month_from.year) * 12 + self.month_until.month - self.month_from.month
+
+    def __str__(self):
+        return (
+            f"{self.month_from.strftime('%Y-%m')}~{self.month_until.strftime('%Y-%m')} "
+            f"[{', '.join(self.keywords)}]"
+        )
+
+
+def add_months(month: datetime, months: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + months
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def split_by_months(shard: SearchShard) -> list[SearchShard]:
+    """
+    按月份对半拆分, 子查询的月份范围首尾相接。范围不足两个月时返回空列表
+    """
+    if shard.months < 2:
+        return []
+    middle = add_months(shard.month_from, shard.months // 2)
+    return [
+        SearchShard(shard.month_from, middle, shard.keywords),
+        SearchShard(middle, shard.month_until, shard.keywords),
+    ]
+
+
+def split_by_keywords(shard: SearchShard) -> list[SearchShard]:
+    """
+    按关键词分组对半拆分。关键词之间是OR关系, 子查询的并集就是原查询, 同时命中两组的文章会重复出现, 合并时按url去重。
+    只剩一个关键词时返回空列表
+    """
+    if len(shard.keywords) < 2:
+        return []
+    half = len(shard.keywords) // 2
+    return [
+        SearchShard(shard.month_from, shard.month_until, shard.keywords[:half]),
+        SearchShard(shard.month_from, shard.month_until, shard.keywords[half:]),
+    ]
+
+
+def split_shard(shard: SearchShard) -> list[SearchShard]:
+    """
+    把结果过多的子查询一分为二: 优先按月份对半分, 只剩一个月时再按关键词分组
+
+    Returns:
+        list[SearchShard]: 拆分后的子查询, 无法再拆分时返回空列表
+    """
+    return split_by_months(shard) or split_by_keywords(shard)
@@ -0,0 +1,258 @@
+import hashlib
+import json
+import os
+import shutil
+
+from datetime import datetime
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from rich.console import Console
+
+from paper import PaperDatabase
+
+SCHEMA = pa.schema(
+    [
+        ("url", pa.string()),
+        ("title", pa.string()),
+        ("authors", pa.string()),
+        ("abstract", pa.string()),
+        ("comments", pa.string()),
+        ("categories", pa.list_(pa.string())),
+        ("first_submitted_date", pa.date32()),
+        ("first_announced_date", pa.date32()),
+        ("title_translated", pa.string()),
+        ("abstract_translated", pa.string()),
+        ("update_time", pa.timestamp("us")),
+    ]
+)
+
+# 计算分区指纹时读取的列; 标题和摘要由content_hash代表, 不需要读取原文
+FINGERPRINT_COLUMNS = (
+    "url",
+    "content_hash",
+    "authors",
+    "comments",
+    "categories",
+    "first_submitted_date",
+    "first_announced_date",
+    "title_translated",
+    "abstract_translated",
+    "update_time",
+)
+
+FORMATS = {"parquet": "parquet", "ipc": "arrow"}
+
+
+class SnapshotExporter:
+    """
+    把papers表导出为按首次公布月份分区的列式快照, 供分析使用:
+        output_dir/
+            manifest.json
+            month=2024-08/part-0.parquet (或part-0.arrow)
+    分类为list<string>列, 日期为date32列。manifest中记录每个分区的指纹(分区内所有行的摘要),
+    再次导出时只重写指纹变化的分区, 并删除数据库中已不存在的月份
+    """
+
+    def __init__(self, paper_db: PaperDatabase, output_dir="./snapshot", format="parquet", batch_size=10000):
+        """
+        Args:
+            paper_db (PaperDatabase): 导出的数据库
+            output_dir (str, optional): 快照目录. Defaults to "./snapshot".
+            format (str, optional): "parquet"或"ipc"(Arrow IPC文件, 可以零拷贝地内存映射读取). Defaults to "parquet".
+            batch_size (int, optional): 每批从数据库读取并写入的行数. Defaults to 10000.
+        """
+        if format not in FORMATS:
+            raise ValueError(f"Unknown snapshot format: {format}")
+        self.paper_db = paper_db
+        self.output_dir = Path(output_dir)
+        self.format = format
+        self.batch_size = batch_size
+        self.console = Console()
+
+    @property
+    def manifest_path(self) -> Path:
+        return self.output_dir / "manifest.json"
+
+    def load_manifest(self) -> dict:
+        try:
+            with open(self.manifest_path, encoding="utf-8") as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return {"format": self.format, "partitions": {}}
+        if manifest.get("format") != self.format:
+            # 格式变化时所有分区都需要重写
+            return {"format": self.format, "partitions": {}}
+        return manifest
+
+    def save_manifest(self, manifest: dict):
+        tmp_path = self.manifest_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
+
+    def partition_path(self, month: str) -> Path:
+        return self.output_dir / f"month={month}" / f"part-0.{FORMATS[self.format]}"
+
+    def _cursor(self):
+        cursor = self.paper_db.reader().cursor()
+        cursor.row_factory = None
+        return cursor
+
+    def fingerprints(self) -> dict[str, tuple[str, int]]:
+        """
+        流式计算每个月份分区的指纹和行数
+
+        Returns:
+            dict[str, tuple[str, int]]: 月份(YYYY-MM) -> (指纹, 行数)
+        """
+        cursor = self._cursor()
+        cursor.execute(
+            f"""
+            SELECT substr(first_announced_date, 1, 7) AS month, {", ".join(FINGERPRINT_COLUMNS)}
+            FROM papers ORDER BY first_announced_date, url
+            """
+        )
+        digests = {}
+        counts: dict[str, int] = {}
+        while rows := cursor.fetchmany(self.batch_size):
+            for month, *values in rows:
+                digest = digests.get(month)
+                if digest is None:
+                    digest = digests[month] = hashlib.blake2b(digest_size=16)
+                    counts[month] = 0
+                digest.update(json.dumps(values, default=str).encode())
+                counts[month] += 1
+        return {month: (digest.hexdigest(), counts[month]) for month, digest in digests.items()}
+
+    @staticmethod
+    def to_record_batch(rows: list[tuple]) -> pa.RecordBatch:
+        """
+        把按`SCHEMA`列顺序读取的行转换为RecordBatch: 分类拆分为列表, 日期和时间转换为对应的类型
+        """
+        arrays = []
+        for field, values in zip(SCHEMA, zip(*rows)):
+            array = pa.array(values, pa.string())
+            if field.name == "categories":
+                array = pc.split_pattern(array, ",")
+            elif field.type != pa.string():
+                array = pc.cast(array, field.type)
+            arrays.append(array)
+        return pa.record_batch(arrays, schema=SCHEMA)
+
+    def write_partition(self, month: str) -> int:
+        """
+        从数据库流式读取一个月份的文章并写入分区文件, 先写临时文件再替换, 中断时不会留下损坏的分区
+
+        Returns:
+            int: 写入的行数
+        """
+        path = self.partition_path(month)
+        path.parent.mkdir(exist_ok=True, parents=True)
+        tmp_path = path.with_suffix(".tmp")
+        cursor = self._cursor()
+        cursor.execute(
+            f"""
+            SELECT {", ".join(SCHEMA.names)} FROM papers
+            WHERE first_announced_date >= ? AND first_announced_date < ?
+            ORDER BY first_announced_date, url
+            """,
+            (f"{month}-01", f"{month}-32"),
+        )
+        if self.format == "parquet":
+            writer = pq.ParquetWriter(tmp_path, SCHEMA, compression="zstd")
+        else:
+            writer = pa.ipc.new_file(str(tmp_path), SCHEMA)
+        written = 0
+        try:
+            while rows := cursor.fetchmany(self.batch_size):
+                batch = self.to_record_batch(rows)
+                if self.format == "parquet":
+                    writer.write_batch(batch)
+                else:
+                    writer.write(batch)
+                written += len(rows)
+        finally:
+            writer.close()
+        os.replace(tmp_path, path)
+        return written
+
+    def export(self) -> dict[str, int]:
+        """
+        导出快照, 只重写指纹变化的分区
+
+        Returns:
+            dict[str, int]: 本次重写的月份 -> 行数
+        """
+        self.output_dir.mkdir(exist_ok=True, parents=True)
+        manifest = self.load_manifest()
+        partitions = manifest["partitions"]
+        fingerprints = self.fingerprints()
+
+        for month in sorted(set(partitions) - set(fingerprints)):
+            shutil.rmtree(self.partition_path(month).parent, ignore_errors=True)
+            del partitions[month]
+            self.console.log(f"[bold yellow]Partition {month} removed.")
+
+        rewritten = {}
+        for month, (fingerprint, rows) in sorted(fingerprints.items()):
+            if partitions.get(month, {}).get("fingerprint") == fingerprint and self.partition_path(month).exists():
+                continue
+            rewritten[month] = self.write_partition(month)
+            partitions[month] = {
+                "fingerprint": fingerprint,
+                "rows": rows,
+                "file": str(self.partition_path(month).relative_to(self.output_dir)),
+                "update_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            }
+            # 每个分区完成后都更新manifest, 中断后已完成的分区不需要重写
+            self.save_manifest(manifest)
+        self.save_manifest(manifest)
+        self.console.log(
+            f"[bold green]Snapshot exported to {self.output_dir}: {len(rewritten)} of {len(fingerprints)} partitions rewritten."
+        )
+        return rewritten
+
+
+def read_snapshot(output_dir="./snapshot", months: list[str] | None = None, columns: list[str] | None = None) -> pa.Table:
+    """
+    以内存映射的方式读取快照, 只读取指定的月份和列。Arrow IPC格式是零拷贝的, Parquet格式需要解码
+
+    Args:
+        output_dir (str, optional): 快照目录. Defaults to "./snapshot".
+        months (list[str] | None, optional): 读取的月份(YYYY-MM), None表示全部. Defaults to None.
+        columns (list[str] | None, optional): 读取的列, None表示全部. Defaults to None.
+
+    Returns:
+        pa.Table: 按月份顺序拼接的表
+    """
+    output_dir = Path(output_dir)
+    with open(output_dir / "manifest.json", encoding="utf-8") as f:
+        manifest = json.load(f)
+    partitions = manifest["partitions"]
+    tables = []
+    for month in sorted(partitions if months is None else set(months) & set(partitions)):
+        path = output_dir / partitions[month]["file"]
+        if manifest["format"] == "parquet":
+            tables.append(pq.read_table(path, columns=columns, memory_map=True))
+        else:
+            table = pa.ipc.open_file(pa.memory_map(str(path))).read_all()
+            tables.append(table.select(columns) if columns is not None else table)
+    if not tables:
+        return (SCHEMA if columns is None else pa.schema([SCHEMA.field(name) for name in columns])).empty_table()
+    return pa.concat_tables(tables)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="把papers.db导出为按月份分区的Parquet/Arrow快照")
+    parser.add_argument("--db", type=str, default="papers.db", help="数据库路径")
+    parser.add_argument("--output", type=str, default="./snapshot", help="快照目录")
+    parser.add_argument("--format", type=str, default="parquet", choices=list(FORMATS), help="快照格式")
+    args = parser.parse_args()
+
+    exporter = SnapshotExporter(PaperDatabase(args.db), args.output, args.format)
+    exporter.export()
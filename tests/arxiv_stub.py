@@ -0,0 +1,98 @@
+"""
+测试用的arXiv搜索页面生成器和本地stub服务器
+"""
+
+import asyncio
+
+from datetime import datetime, timedelta
+
+from aiohttp import web
+
+
+def entry(i, day, comment=""):
+    aid = f"2408.{i:05d}"
+    return f"""<li class="arxiv-result">
+ <div class="is-marginless">
+  <p class="list-title is-inline-block"><a href="https://arxiv.org/abs/{aid}">arXiv:{aid}</a>
+   <span>&nbsp;[<a href="https://arxiv.org/pdf/{aid}">pdf</a>]&nbsp;</span></p>
+  <div class="tags is-inline-block">
+   <span class="tag is-small is-link tooltip is-tooltip-top" data-tooltip="CV">cs.CV</span>
+   <span class="tag is-small is-grey tooltip is-tooltip-top" data-tooltip="AI">cs.AI</span>
+  </div>
+ </div>
+ <p class="title is-5 mathjax">
+   Paper {comment}<span class="search-hit mathjax">LLM</span> number {i}
+ </p>
+ <p class="authors"><span class="has-text-black-bis has-text-weight-semibold">Authors:</span>
+  <a href="/search/?x">Alice A</a>, <a href="/search/?y">Bob B</a></p>
+ <p class="abstract mathjax"><span class="has-text-black-bis">Abstract</span>:
+  <span class="abstract-short has-text-grey-dark mathjax" id="{aid}v1-abstract-short">short</span>
+  <span class="abstract-full has-text-grey-dark mathjax" id="{aid}v1-abstract-full" style="display: none;">
+   We study <span class="search-hit mathjax">LLM</span> things{comment}
+   for item {i} &amp; more.
+   <a class="is-size-7" style="white-space: nowrap;" onclick="document.getElementById('x').style.display = 'none';">&#9651; Less</a>
+  </span></p>
+ <p class="is-size-7"><span class="has-text-black-bis">Submitted</span> {day.day} {day.strftime('%B')}, {day.year}; <span>v1</span>submitted {day.day} {day.strftime('%B')}, {day.year}; <span>originally announced</span> August 2024.</p>
+ <p class="comments is-size-7"><span class="has-text-black-bis">Comments:</span> <span>12 pages</span></p>
+</li>"""
+
+
+def page(total, start, size=50, base=datetime(2024, 8, 30), comment=""):
+    """
+    生成第[start, start+size)条结果的搜索页面, 结果按首次公布日期降序排列
+    """
+    items = [entry(total - k, base - timedelta(days=k // 7), comment) for k in range(start, min(start + size, total))]
+    return render(items, total, start, size)
+
+
+def render(items, total, start, size=50):
+    """
+    由本页的结果条目(`entry`的返回值)生成搜索页面
+    """
+    if total:
+        head = f"Showing {start + 1}&ndash;{min(start + size, total)} of {total:,} results"
+    else:
+        head = "Sorry, your query returned no results"
+    return f"""<html><body><main id="main-container"><div class="level is-marginless"><div class="level-left"><h1 class="title is-clearfix">{head}</h1></div></div>
+<ol class="breathe-horizontal">{''.join(items)}</ol></main></body></html>"""
+
+
+def make_app(total=230, respond=None, stats=None):
+    """
+    Args:
+        respond (Callable[[web.Request, int], web.Response | None] | None): 自定义响应, 返回None时使用正常页面
+        stats (dict | None): 记录请求次数("hits")
+    """
+    stats = stats if stats is not None else {}
+
+    async def handler(request):
+        start = int(request.query.get("start", 0))
+        size = int(request.query.get("size", 50))
+        stats["hits"] = stats.get("hits", 0) + 1
+        await asyncio.sleep(0.01)
+        if respond is not None and (response := respond(request, start)) is not None:
+            return response
+        return web.Response(text=page(total, start, size), content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/search/advanced", handler)
+    return app
+
+
+async def serve(app) -> tuple[web.AppRunner, int]:
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    return runner, site._server.sockets[0].getsockname()[1]
+
+
+def point_to(scraper, port):
+    """
+    把爬虫的搜索url指向本地stub服务器
+    """
+    get_url = scraper.get_url
+    scraper.get_url = lambda *args, **kwargs: get_url(*args, **kwargs).replace(
+        "https://arxiv.org", f"http://127.0.0.1:{port}"
+    )
+    return scraper
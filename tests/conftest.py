@@ -0,0 +1,38 @@
+import sys
+
+from pathlib import Path
+
+import pytest
+
+# 模块位于仓库根目录
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+class DummyExporter:
+    def __init__(self, *args, **kwargs):
+        pass
+
+
+@pytest.fixture
+def make_scraper(tmp_path, monkeypatch):
+    """
+    在临时目录中创建ArxivScraper(papers.db位于临时目录), 导出器替换为空实现
+    """
+    import arxiv_crawler
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(arxiv_crawler, "PaperExporter", DummyExporter)
+    scrapers = []
+
+    def factory(**kwargs):
+        kwargs.setdefault("date_from", "2024-08-01")
+        kwargs.setdefault("date_until", "2024-08-31")
+        kwargs.setdefault("requests_per_second", 1000)
+        kwargs.setdefault("max_retries", 0)
+        scraper = arxiv_crawler.ArxivScraper(**kwargs)
+        scrapers.append(scraper)
+        return scraper
+
+    yield factory
+    for scraper in scrapers:
+        scraper.close()
@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+import async_translator
+from async_translator import async_translate_batch, join_segments, pack_segments, split_segments
+from paper import PaperDatabase
+from rate_limiter import RateController
+from test_paper_db import make_paper
+from translation_cache import TranslationCache, set_default_cache
+
+
+@pytest.fixture
+def endpoint(monkeypatch, tmp_path):
+    """
+    替换翻译接口: 把"word"翻译为"词", `mangle`为True时丢掉分隔符使切分失败; 记录请求数和最大并发数
+    """
+    stats = {"requests": 0, "in_flight": 0, "max_in_flight": 0, "mangle": False, "sessions": set()}
+
+    async def fake_translate(data, url=None, proxy=None, session=None):
+        stats["requests"] += 1
+        stats["sessions"].add(session)
+        stats["in_flight"] += 1
+        stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+        await asyncio.sleep(0.001)
+        result = data.raw.replace("word", "词")
+        data.result = async_translator.SEGMENT_PATTERN.sub("", result) if stats["mangle"] else result
+        stats["in_flight"] -= 1
+
+    monkeypatch.setattr(async_translator, "async_google_translate", fake_translate)
+    cache = TranslationCache(str(tmp_path / "translation_cache.db"))
+    set_default_cache(cache)
+    yield stats
+    set_default_cache(None)
+    cache.close()
+
+
+def test_segments_round_trip():
+    texts = ["first word", "second\nword", "third"]
+    assert split_segments(join_segments(texts), 3) == texts
+    assert split_segments(join_segments(texts).replace("@@1@@", ""), 3) is None
+    assert pack_segments(["x" * 5000, "@@3@@", "a", "b"], max_chars=4500) == [[0], [1], [2, 3]]
+
+
+def test_batches_share_requests_and_cache(endpoint):
+    texts = [f"word {i}" + " word" * 50 for i in range(300)] + [None, ""]
+    expected = [text.replace("word", "词") for text in texts[:300]] + [None, ""]
+    rate_controller = RateController(requests_per_second=1000, burst=1000, initial_concurrency=4, max_concurrency=4)
+    assert asyncio.run(async_translate_batch(texts, rate_controller=rate_controller)) == expected
+    assert endpoint["requests"] < 30
+    endpoint["requests"] = 0
+    assert asyncio.run(async_translate_batch(texts, rate_controller=rate_controller)) == expected
+    assert endpoint["requests"] == 0
+
+
+def test_failed_split_falls_back_with_bounded_concurrency(endpoint):
+    endpoint["mangle"] = True
+    rate_controller = RateController(requests_per_second=1000, burst=1000, initial_concurrency=3, max_concurrency=3)
+
+    async def main():
+        # 多个并发调用共享同一个限速器
+        return await asyncio.gather(
+            *(
+                async_translate_batch([f"word {i} {j}" for j in range(100)], cache=False, rate_controller=rate_controller)
+                for i in range(5)
+            )
+        )
+
+    results = asyncio.run(main())
+    assert results == [[f"词 {i} {j}" for j in range(100)] for i in range(5)]
+    assert endpoint["requests"] == 5 * 101
+    assert endpoint["max_in_flight"] <= 3
+
+
+def test_translate_missing_shares_one_session(endpoint, tmp_path):
+    paper_db = PaperDatabase(str(tmp_path / "papers.db"))
+    paper_db.add_papers([make_paper(i, title=f"word {i}") for i in range(5)])
+    asyncio.run(paper_db.translate_missing(chunk_size=2))
+    (session,) = endpoint["sessions"]
+    assert session is not None
+    assert endpoint["requests"] >= 3
+    papers = sorted(paper_db.fetch_all(), key=lambda paper: paper.url)
+    assert [paper.title_translated for paper in papers] == [f"词 {i}" for i in range(5)]
+    paper_db.close()
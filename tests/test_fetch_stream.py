@@ -0,0 +1,38 @@
+import asyncio
+
+from aiohttp import web
+
+from arxiv_stub import make_app, point_to, serve
+from test_paper_db import db_threads
+
+
+def run_stream(scraper, app):
+    async def main():
+        runner, port = await serve(app)
+        try:
+            point_to(scraper, port)
+            return await asyncio.wait_for(scraper.fetch_stream(batch_size=60), timeout=10)
+        finally:
+            await runner.cleanup()
+
+    return asyncio.run(main())
+
+
+def test_fetch_stream_stores_all_pages(make_scraper):
+    scraper = make_scraper()
+    assert run_stream(scraper, make_app(total=230)) == 230
+    assert not db_threads()
+    assert len(scraper.paper_db.fetch_all()) == 230
+
+
+def test_fetch_stream_skips_a_page_that_cannot_be_parsed(make_scraper):
+    def respond(request, start):
+        if start == 100:
+            return web.Response(text="<html><body>Down for maintenance</body></html>", content_type="text/html")
+
+    scraper = make_scraper()
+    assert run_stream(scraper, make_app(total=230, respond=respond)) == 180
+    assert len(scraper.paper_db.fetch_all()) == 180
+    (failure,) = scraper.failures
+    assert failure.start == 100
+    assert failure.error.startswith("ValueError: Unexpected search page")
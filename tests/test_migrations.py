@@ -0,0 +1,75 @@
+import sqlite3
+
+from datetime import datetime
+
+from paper import MIGRATIONS, PaperDatabase
+
+# 迁移之前的papers表结构
+LEGACY_SCHEMA = """
+CREATE TABLE papers (
+    url TEXT PRIMARY KEY,
+    authors TEXT NOT NULL,
+    title_translated TEXT,
+    first_submitted_date DATE NOT NULL,
+    first_announced_date DATE NOT NULL,
+    update_time DATETIME NOT NULL,
+    categories TEXT NOT NULL,
+    title TEXT NOT NULL,
+    comments TEXT NOT NULL,
+    abstract TEXT NOT NULL,
+    abstract_translated TEXT
+)
+"""
+
+
+def test_hot_queries_are_indexed_on_new_database(tmp_path):
+    paper_db = PaperDatabase(str(tmp_path / "papers.db"))
+    assert paper_db.unindexed_hot_queries() == []
+    paper_db.close()
+
+
+def test_hot_queries_are_indexed_after_migrating_legacy_database(tmp_path):
+    path = str(tmp_path / "papers.db")
+    conn = sqlite3.connect(path)
+    conn.execute(LEGACY_SCHEMA)
+    conn.execute(
+        "INSERT INTO papers VALUES ('https://arxiv.org/abs/2408.00001', 'Alice A', NULL, '2024-08-01', '2024-08-02', "
+        "'2024-08-02 00:00:00', 'cs.CL,cs.AI', 'Title', 'No comments', 'Abstract', NULL)"
+    )
+    conn.commit()
+    conn.close()
+
+    paper_db = PaperDatabase(path)
+    assert paper_db.conn.execute("PRAGMA user_version").fetchone()[0] == len(MIGRATIONS)
+    assert paper_db.unindexed_hot_queries() == []
+    # 迁移时回填了分类关联表
+    ((paper, reason),) = paper_db.fetch_filtered_papers_on_date(datetime(2024, 8, 2), ["cs.CL"], [])
+    assert (paper.title, reason) == ("Title", "-")
+    # 重建papers表时保留了全文索引
+    assert [hit.paper.url for hit in paper_db.search("Abstract")] == ["https://arxiv.org/abs/2408.00001"]
+    paper_db.close()
+
+
+def test_missing_index_is_reported(tmp_path):
+    paper_db = PaperDatabase(str(tmp_path / "papers.db"))
+    with paper_db._transaction():
+        paper_db.conn.execute("DROP INDEX idx_papers_announced_update")
+    assert "fetch_papers_on_date" in paper_db.unindexed_hot_queries()
+    paper_db.close()
+
+
+def test_search_index_survives_vacuum(tmp_path):
+    from test_paper_db import make_paper
+
+    paper_db = PaperDatabase(str(tmp_path / "papers.db"))
+    papers = [make_paper(i, title=f"Paper {i} topic{i}") for i in range(10)]
+    paper_db.add_papers(papers)
+    # 全文索引通过rowid关联papers, rowid必须是显式的INTEGER PRIMARY KEY, VACUUM才不会重新编号
+    pk = [(row[1], row[2]) for row in paper_db.conn.execute("PRAGMA table_info(papers)") if row[5]]
+    assert pk == [("id", "INTEGER")]
+    with paper_db._transaction():
+        # 删除开头的行留下rowid空洞
+        paper_db.conn.execute("DELETE FROM papers WHERE url IN (?, ?)", (papers[0].url, papers[1].url))
+    paper_db.conn.execute("VACUUM")
+    assert [hit.paper.url for hit in paper_db.search("topic5")] == [papers[5].url]
+    paper_db.close()
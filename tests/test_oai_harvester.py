@@ -0,0 +1,98 @@
+import asyncio
+
+from datetime import datetime
+
+from aiohttp import web
+
+from arxiv_stub import serve
+from test_paper_db import db_threads
+from oai_harvester import OAIHarvester
+from paper import Paper, PaperDatabase
+
+RECORD = """<record><header><identifier>oai:arXiv.org:{id}</identifier><datestamp>2024-08-10</datestamp></header>
+<metadata><arXivRaw xmlns="http://arxiv.org/OAI/arXivRaw/">
+<id>{id}</id><authors>Alice A and Bob B</authors><title>Paper {id} on LLM</title>
+<categories>cs.CL cs.AI</categories><comments>9 pages</comments><abstract>  An abstract
+  for {id}.</abstract>
+<version version="v1"><date>Mon, 5 Aug 2024 17:00:00 GMT</date></version>
+</arXivRaw></metadata></record>"""
+
+PAGE = """<?xml version="1.0" encoding="UTF-8"?>
+<OAI-PMH xmlns="http://www.openarchives.org/OAI/2.0/"><ListRecords>{records}{token}</ListRecords></OAI-PMH>"""
+
+
+def make_app(stats):
+    pages = {
+        None: (["2408.00001", "2408.00002"], '<resumptionToken cursor="0">next</resumptionToken>'),
+        "next": (["2408.00003"], "<resumptionToken/>"),
+    }
+
+    async def handler(request):
+        stats["hits"] = stats.get("hits", 0) + 1
+        ids, token = pages[request.query.get("resumptionToken")]
+        records = "".join(RECORD.format(id=id) for id in ids)
+        return web.Response(body=PAGE.format(records=records, token=token).encode(), content_type="text/xml")
+
+    app = web.Application()
+    app.router.add_get("/oai", handler)
+    return app
+
+
+def test_harvest_inserts_only_unseen_papers(tmp_path):
+    paper_db = PaperDatabase(str(tmp_path / "papers.db"))
+    crawled = Paper(
+        url="https://arxiv.org/abs/2408.00002",
+        title="Paper 2408.00002 on LLM",
+        first_submitted_date=datetime(2024, 8, 5),
+        categories=["cs.CL", "cs.AI"],
+        authors="Alice A, Bob B",
+        abstract="An abstract for 2408.00002.",
+        comments="9 pages",
+        first_announced_date=datetime(2024, 8, 8),
+        title_translated="标题",
+        abstract_translated="摘要",
+    )
+    paper_db.add_papers([crawled])
+    cursor = paper_db.conn.cursor()
+    cursor.row_factory = None
+    before = cursor.execute("SELECT * FROM papers").fetchone()
+    stats = {}
+
+    async def main():
+        runner, port = await serve(make_app(stats))
+        harvester = OAIHarvester(
+            "2024-08-01", "2024-08-31", base_url=f"http://127.0.0.1:{port}/oai", requests_per_second=100,
+            paper_db=paper_db,
+        )
+        try:
+            return await harvester.harvest()
+        finally:
+            await runner.cleanup()
+
+    assert asyncio.run(main()) == 2
+    assert not db_threads()
+    assert stats["hits"] == 2
+    papers = {paper.url: paper for paper in paper_db.fetch_all()}
+    assert set(papers) == {f"https://arxiv.org/abs/2408.0000{i}" for i in (1, 2, 3)}
+    # 已爬取的文章(公布日期、翻译、update_time)保持不变
+    assert cursor.execute("SELECT * FROM papers WHERE url = ?", (crawled.url,)).fetchone() == before
+    new = papers["https://arxiv.org/abs/2408.00001"]
+    assert new.authors == "Alice A, Bob B"
+    assert new.abstract == "An abstract for 2408.00001."
+    assert new.categories == ["cs.CL", "cs.AI"]
+    assert new.first_submitted_date == datetime(2024, 8, 5)
+    paper_db.close()
+
+
+def test_parse_records_skips_records_without_valid_date():
+    harvester = OAIHarvester.__new__(OAIHarvester)
+    harvester.optional_keywords = None
+    missing = RECORD.format(id="2408.00004").replace(
+        '<version version="v1"><date>Mon, 5 Aug 2024 17:00:00 GMT</date></version>', ""
+    )
+    malformed = RECORD.format(id="2408.00005").replace("Mon, 5 Aug 2024 17:00:00 GMT", "not a date")
+    records = RECORD.format(id="2408.00001") + missing + malformed
+    content = PAGE.format(records=records, token="<resumptionToken/>").encode()
+    *papers, token = harvester.parse_records(content)
+    assert [paper.url for paper in papers] == ["https://arxiv.org/abs/2408.00001"]
+    assert token is None
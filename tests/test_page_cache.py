@@ -0,0 +1,42 @@
+import asyncio
+
+from arxiv_stub import make_app, page, point_to, serve
+
+
+def run_with_server(scraper, app, coro_fn):
+    async def main():
+        runner, port = await serve(app)
+        try:
+            point_to(scraper, port)
+            # 缓存中是月初的旧页面: 只有100条结果
+            for start in range(0, 100, scraper.step):
+                scraper.page_cache.put(scraper.get_url(start), page(100, start))
+            return await coro_fn()
+        finally:
+            await runner.cleanup()
+
+    return asyncio.run(main())
+
+
+def test_update_bypasses_page_cache(make_scraper, tmp_path):
+    stats = {}
+    scraper = make_scraper(cache_dir=str(tmp_path / "cache"), trans_to=None)
+    run_with_server(scraper, make_app(total=150, stats=stats), scraper.update_all)
+    assert stats["hits"] == 3
+    assert len(scraper.papers) == 150
+
+
+def test_full_crawl_reads_page_cache(make_scraper, tmp_path):
+    stats = {}
+    scraper = make_scraper(cache_dir=str(tmp_path / "cache"))
+    content = run_with_server(scraper, make_app(total=150, stats=stats), lambda: scraper.request(0))
+    assert "of 100 results" in content
+    assert stats.get("hits", 0) == 0
+
+
+def test_offline_update_replays_page_cache(make_scraper, tmp_path):
+    stats = {}
+    scraper = make_scraper(cache_dir=str(tmp_path / "cache"), offline=True)
+    content = run_with_server(scraper, make_app(total=150, stats=stats), lambda: scraper.request(0, use_cache=False))
+    assert "of 100 results" in content
+    assert stats.get("hits", 0) == 0
@@ -0,0 +1,100 @@
+import asyncio
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pytest
+
+from paper import AsyncPaperDatabase, BatchedWriter, Paper, PaperDatabase, _category_tuple
+
+
+def make_paper(i, **kwargs):
+    day = datetime(2024, 8, 1 + i % 28)
+    fields = dict(
+        url=f"https://arxiv.org/abs/2408.{i:05d}",
+        title=f"Paper {i}",
+        first_submitted_date=day,
+        categories=["cs.CL", "cs.AI"],
+        authors="Alice A, Bob B",
+        abstract=f"Abstract {i}.",
+        comments="No comments",
+        first_announced_date=day,
+    )
+    return Paper(**(fields | kwargs))
+
+
+def db_threads() -> list[threading.Thread]:
+    return [thread for thread in threading.enumerate() if thread.name.startswith("paper-db")]
+
+
+@pytest.fixture
+def paper_db(tmp_path):
+    paper_db = PaperDatabase(str(tmp_path / "papers.db"))
+    yield paper_db
+    paper_db.close()
+
+
+def test_batched_writer_put_raises_when_writer_fails_with_full_queue():
+    def write(batch):
+        raise OSError("disk full")
+
+    async def main():
+        async with BatchedWriter(write, batch_size=1, flush_interval=0) as writer:
+            for row in range(100):
+                await writer.put(row)
+
+    with pytest.raises(OSError, match="disk full"):
+        asyncio.run(asyncio.wait_for(main(), timeout=5))
+
+
+def test_batched_writer_writes_all_rows():
+    batches = []
+
+    async def main():
+        async with BatchedWriter(batches.append, batch_size=10, flush_interval=0.01) as writer:
+            for row in range(95):
+                await writer.put(row)
+
+    asyncio.run(main())
+    assert sorted(row for batch in batches for row in batch) == list(range(95))
+    assert max(len(batch) for batch in batches) <= 10
+
+
+@pytest.mark.parametrize("mode", ["set", "bloom", "sql"])
+def test_url_index_reads_from_other_threads_during_writes(tmp_path, mode):
+    paper_db = PaperDatabase(str(tmp_path / "papers.db"), url_index=mode)
+    papers = [make_paper(i) for i in range(2000)]
+    urls = [paper.url for paper in papers]
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        lookups = [executor.submit(paper_db.known_urls, urls) for _ in range(8)]
+        for i in range(0, len(papers), 100):
+            paper_db.add_papers(papers[i : i + 100])
+        for lookup in lookups:
+            assert lookup.result() <= set(urls)
+        assert executor.submit(paper_db.known_urls, urls).result() == set(urls)
+    paper_db.close()
+
+
+def test_async_db_context_shuts_down_its_thread(paper_db):
+    async def main(adb):
+        async with adb:
+            await adb.add_papers([make_paper(1)])
+            await adb.update_translations([("https://arxiv.org/abs/2408.00001", "标题", "摘要")])
+            assert db_threads()
+        assert not db_threads()
+        # 关闭后仍可再次使用, 数据库线程会重新创建
+        assert await adb.count_new_urls(["https://arxiv.org/abs/2408.00001"]) == 0
+        adb.close()
+
+    asyncio.run(main(AsyncPaperDatabase(paper_db)))
+    assert not db_threads()
+    assert paper_db.fetch_all()[0].title_translated == "标题"
+
+
+def test_compact_papers_share_bounded_category_tuples(paper_db):
+    paper_db.add_papers([make_paper(i) for i in range(5)])
+    papers = paper_db.fetch_all_compact()
+    assert papers[0].categories == ("cs.CL", "cs.AI")
+    assert all(paper.categories is papers[0].categories for paper in papers)
+    assert _category_tuple.cache_info().maxsize is not None
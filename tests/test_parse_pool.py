@@ -0,0 +1,16 @@
+import os
+
+from arxiv_stub import make_app
+from test_fetch_stream import run_stream
+
+
+def test_parse_workers_sentinel_uses_all_cores(make_scraper):
+    assert make_scraper(parse_workers=-1).parse_workers == os.cpu_count()
+    assert make_scraper(parse_workers=0).parse_workers == 0
+    assert make_scraper(parse_workers=3).parse_workers == 3
+
+
+def test_fetch_stream_parses_in_process_pool(make_scraper):
+    scraper = make_scraper(parse_workers=2)
+    assert run_stream(scraper, make_app(total=230)) == 230
+    assert scraper.parse_pool is None
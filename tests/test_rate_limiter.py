@@ -0,0 +1,26 @@
+import time
+
+from rate_limiter import RateController
+
+
+def test_throttle_burst_halves_concurrency_once():
+    controller = RateController(initial_concurrency=8, max_concurrency=8, throttle_cooldown=5.0)
+    for _ in range(8):
+        controller.on_throttle()
+    assert controller.concurrency == 4
+
+
+def test_throttle_after_cooldown_halves_again():
+    controller = RateController(initial_concurrency=8, max_concurrency=8, throttle_cooldown=5.0)
+    controller.on_throttle()
+    controller.last_decrease = time.monotonic() - 5.0
+    controller.on_throttle()
+    assert controller.concurrency == 2
+
+
+def test_throttle_respects_retry_after_within_cooldown():
+    controller = RateController(initial_concurrency=8, max_concurrency=8)
+    controller.on_throttle()
+    controller.on_throttle(retry_after=30)
+    assert controller.concurrency == 4
+    assert controller.blocked_until - time.monotonic() > 29
@@ -0,0 +1,12 @@
+from test_paper_db import make_paper
+
+
+def test_reprocess_papers_writes_title_column(make_scraper, tmp_path):
+    scraper = make_scraper()
+    scraper.paper_db.add_papers([make_paper(i) for i in range(3)])
+    scraper.reprocess_papers()
+    lines = (tmp_path / "announced_date.csv").read_text().splitlines()
+    assert lines[0] == "url,title,announced_date,submitted_date"
+    assert [line.split(",")[:2] for line in lines[1:]] == [
+        [f"https://arxiv.org/abs/2408.{i:05d}", f"Paper {i}"] for i in range(3)
+    ]
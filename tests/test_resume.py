@@ -0,0 +1,42 @@
+import asyncio
+
+from aiohttp import web
+
+from arxiv_stub import make_app, point_to, serve
+
+
+def test_fetch_all_resumes_from_done_offsets(make_scraper):
+    stats = {}
+
+    def fail_page_100_once(request, start):
+        if start == 100 and not stats.get("failed"):
+            stats["failed"] = True
+            return web.Response(status=500)
+
+    scraper, resumed = make_scraper(), make_scraper()
+
+    async def main():
+        # 两次爬取使用同一个stub服务器, 搜索url(即断点记录的指纹)保持不变
+        runner, port = await serve(make_app(total=230, respond=fail_page_100_once, stats=stats))
+        try:
+            await point_to(scraper, port).fetch_all()
+            assert [failure.start for failure in scraper.failures] == [100]
+            # 完成的页面已经写入papers, 断点记录中只有起始序号和状态
+            assert scraper.paper_db.conn.execute("SELECT COUNT(*) FROM papers").fetchone()[0] == 180
+            columns = [row[1] for row in scraper.paper_db.conn.execute("PRAGMA table_info(crawl_pages)")]
+            assert "papers" not in columns
+            assert scraper.paper_db.unfinished_crawl_job(scraper.crawl_fingerprint()) == (230, {0, 50, 150, 200})
+
+            stats["hits"] = 0
+            await point_to(resumed, port).fetch_all(resume=True)
+        finally:
+            await runner.cleanup()
+
+    asyncio.run(main())
+    assert stats["hits"] == 1
+    assert not resumed.failures
+    assert resumed.paper_db.conn.execute("SELECT COUNT(*) FROM papers").fetchone()[0] == 230
+    assert resumed.paper_db.unfinished_crawl_job(resumed.crawl_fingerprint()) is None
+    # 重新推断后公布日期随url单调不减
+    dates = [row[0] for row in resumed.paper_db.conn.execute("SELECT first_announced_date FROM papers ORDER BY url")]
+    assert dates == sorted(dates)
@@ -0,0 +1,36 @@
+from pathlib import Path
+
+import pytest
+
+from search_parser import LxmlSearchParser, SoupSearchParser, parse_search_ids
+
+PAGES = sorted((Path(__file__).parent / "pages").glob("*.html"))
+
+
+@pytest.mark.parametrize("path", PAGES, ids=lambda path: path.name)
+def test_parsers_agree(path):
+    content = path.read_text(encoding="utf-8")
+    assert LxmlSearchParser().parse(content) == SoupSearchParser().parse(content)
+
+
+@pytest.mark.parametrize("path", PAGES, ids=lambda path: path.name)
+def test_search_ids_match_full_parse(path):
+    content = path.read_text(encoding="utf-8")
+    total, entries = SoupSearchParser().parse(content)
+    assert parse_search_ids(content) == (total, [entry.url for entry in entries])
+
+
+def test_comments_are_skipped():
+    content = (Path(__file__).parent / "pages" / "search_physics.html").read_text(encoding="utf-8")
+    for parser in (LxmlSearchParser(), SoupSearchParser()):
+        total, entries = parser.parse(content)
+        assert total == 3
+        assert entries[1].title == "Scaling Language Models with $O(\\log n)$ Memory"
+        assert "appendix" not in entries[1].abstract
+        assert "venue" not in entries[1].comments
+
+
+@pytest.mark.parametrize("parser", [LxmlSearchParser(), SoupSearchParser()], ids=lambda parser: parser.name)
+def test_unexpected_page_raises_value_error(parser):
+    with pytest.raises(ValueError, match="Unexpected search page"):
+        parser.parse("<html><body>Down for maintenance</body></html>")
@@ -0,0 +1,134 @@
+import asyncio
+
+from datetime import datetime
+
+from aiohttp import web
+
+import arxiv_crawler
+from arxiv_stub import entry, point_to, render, serve
+from shard_planner import SearchShard, split_by_keywords, split_by_months, split_shard
+
+KEYWORDS = ("LLM", "GPT", "agent", "diffusion")
+
+
+def test_split_by_months_is_contiguous():
+    shard = SearchShard.from_months(datetime(2024, 1, 15), datetime(2024, 7, 1), KEYWORDS)
+    first, second = split_by_months(shard)
+    assert (first.month_from, first.month_until) == (datetime(2024, 1, 1), datetime(2024, 4, 1))
+    assert (second.month_from, second.month_until) == (datetime(2024, 4, 1), datetime(2024, 7, 1))
+
+
+def test_single_month_splits_by_keywords():
+    shard = SearchShard(datetime(2024, 8, 1), datetime(2024, 9, 1), KEYWORDS)
+    assert split_shard(shard) == split_by_keywords(shard)
+    assert [child.keywords for child in split_shard(shard)] == [KEYWORDS[:2], KEYWORDS[2:]]
+    assert split_shard(SearchShard(datetime(2024, 8, 1), datetime(2024, 9, 1), ("LLM",))) == []
+
+
+# stub数据: 6个月, 每月80篇, 每篇命中一个关键词
+PAPERS = [(i, datetime(2024, 1 + i // 80, 1 + i % 28), KEYWORDS[i % 4]) for i in range(480)]
+
+
+def make_app(drop_in_subranges=False, fail_once=(), stats=None):
+    """
+    按月份范围和关键词过滤的搜索stub。`drop_in_subranges`模拟按月份拆分时结果对不上的情况:
+    使用全部关键词、月份范围比根查询窄的查询会漏掉一部分文章。
+    `fail_once`中的(起始月份, start)第一次请求时返回500, `stats`记录start>0的翻页请求次数("pages")
+    """
+    failed = set()
+    stats = stats if stats is not None else {}
+
+    async def handler(request):
+        query = request.query
+        key = (query["date-from_date"], int(query["start"]))
+        if key in fail_once and key not in failed:
+            failed.add(key)
+            return web.Response(status=500)
+        if key[1] > 0:
+            stats["pages"] = stats.get("pages", 0) + 1
+        month_from = datetime.strptime(query["date-from_date"], "%Y-%m")
+        month_until = datetime.strptime(query["date-to_date"], "%Y-%m")
+        keywords = {value for key, value in query.items() if key.endswith("-term")}
+        narrow = (month_until.year - month_from.year) * 12 + month_until.month - month_from.month < 6
+        matched = [
+            (i, day)
+            for i, day, keyword in PAPERS
+            if month_from <= day.replace(day=1) < month_until
+            and keyword in keywords
+            and not (drop_in_subranges and narrow and len(keywords) == len(KEYWORDS) and i % 10 == 0)
+        ]
+        matched.sort(key=lambda paper: paper[1], reverse=True)
+        start, size = int(query["start"]), int(query["size"])
+        items = [entry(i + 1, day) for i, day in matched[start : start + size]]
+        return web.Response(text=render(items, len(matched), start, size), content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/search/advanced", handler)
+    return app
+
+
+def plan_and_fetch(scraper, app, monkeypatch):
+    monkeypatch.setattr(arxiv_crawler, "SEARCH_RESULT_LIMIT", 100)
+
+    planned = []
+    plan_shards = scraper.plan_shards
+
+    async def record_plan():
+        planned.extend(await plan_shards())
+        return planned
+
+    scraper.plan_shards = record_plan
+
+    async def main():
+        runner, port = await serve(app)
+        try:
+            point_to(scraper, port)
+            await scraper.fetch_sharded()
+            return planned
+        finally:
+            await runner.cleanup()
+
+    return asyncio.run(main())
+
+
+def test_month_shards_cover_all_papers(make_scraper, monkeypatch):
+    scraper = make_scraper(date_from="2024-01-01", date_until="2024-07-01", optional_keywords=list(KEYWORDS))
+    shards = plan_and_fetch(scraper, make_app(), monkeypatch)
+    assert all(total <= 100 for _, total, _ in shards)
+    assert all(shard.months == 1 and shard.keywords == KEYWORDS for shard, _, _ in shards)
+    assert sum(total for _, total, _ in shards) == 480
+    assert len({paper.url for paper in scraper.papers}) == len(scraper.papers) == 480
+
+
+def test_inconsistent_month_split_falls_back_to_keywords(make_scraper, monkeypatch):
+    scraper = make_scraper(date_from="2024-01-01", date_until="2024-07-01", optional_keywords=list(KEYWORDS))
+    shards = plan_and_fetch(scraper, make_app(drop_in_subranges=True), monkeypatch)
+    # 根查询按月份拆分对不上, 改为按关键词拆分, 之后的按月拆分都是一致的
+    assert all(shard.keywords in (KEYWORDS[:2], KEYWORDS[2:]) for shard, _, _ in shards)
+    assert len({paper.url for paper in scraper.papers}) == len(scraper.papers) == 480
+
+
+def test_sharded_crawl_resumes_each_shard(make_scraper, monkeypatch):
+    monkeypatch.setattr(arxiv_crawler, "SEARCH_RESULT_LIMIT", 100)
+    stats = {}
+    app = make_app(fail_once={("2024-03", 50)}, stats=stats)
+    kwargs = dict(date_from="2024-01-01", date_until="2024-07-01", optional_keywords=list(KEYWORDS))
+    scraper, resumed = make_scraper(**kwargs), make_scraper(**kwargs)
+
+    async def main():
+        runner, port = await serve(app)
+        try:
+            await point_to(scraper, port).fetch_sharded()
+            assert [failure.start for failure in scraper.failures] == [50]
+            assert scraper.paper_db.conn.execute("SELECT COUNT(*) FROM papers").fetchone()[0] == 450
+            stats["pages"] = 0
+            await point_to(resumed, port).fetch_sharded(resume=True)
+        finally:
+            await runner.cleanup()
+
+    asyncio.run(main())
+    # 其他子查询的页面都已完成, 只重新请求失败的一页
+    assert stats["pages"] == 1
+    assert not resumed.failures
+    assert resumed.paper_db.conn.execute("SELECT COUNT(*) FROM papers").fetchone()[0] == 480
+    assert resumed.paper_db.conn.execute("SELECT COUNT(*) FROM crawl_jobs WHERE status = 'running'").fetchone()[0] == 0
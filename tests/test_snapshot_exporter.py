@@ -0,0 +1,66 @@
+from datetime import date, datetime
+
+import pyarrow as pa
+import pytest
+
+from paper import PaperDatabase
+from snapshot_exporter import SCHEMA, SnapshotExporter, read_snapshot
+from test_paper_db import make_paper
+
+
+def make_papers():
+    # 7月、8月、9月各两篇
+    return [
+        make_paper(i, first_announced_date=datetime(2024, 7 + i // 2, 10 + i), categories=["cs.CL", f"cs.{i}"])
+        for i in range(6)
+    ]
+
+
+@pytest.fixture(params=["parquet", "ipc"])
+def exporter(request, tmp_path):
+    paper_db = PaperDatabase(str(tmp_path / "papers.db"))
+    paper_db.add_papers(make_papers())
+    yield SnapshotExporter(paper_db, tmp_path / "snapshot", request.param, batch_size=1)
+    paper_db.close()
+
+
+def test_snapshot_round_trips_types(exporter):
+    assert exporter.export() == {"2024-07": 2, "2024-08": 2, "2024-09": 2}
+    table = read_snapshot(exporter.output_dir)
+    assert table.schema == SCHEMA
+    rows = table.to_pylist()
+    assert [row["url"] for row in rows] == [paper.url for paper in make_papers()]
+    assert rows[0]["categories"] == ["cs.CL", "cs.0"]
+    assert rows[0]["first_submitted_date"] == date(2024, 8, 1)
+    assert rows[5]["first_announced_date"] == date(2024, 9, 15)
+
+
+def test_rerun_rewrites_only_changed_month(exporter):
+    exporter.export()
+    untouched = exporter.partition_path("2024-07").stat().st_mtime_ns
+    assert exporter.export() == {}
+    changed = make_papers()[3]
+    changed.comments = "10 pages"
+    exporter.paper_db.add_papers([changed])
+    assert exporter.export() == {"2024-08": 2}
+    table = read_snapshot(exporter.output_dir, months=["2024-08"])
+    assert table.column("comments").to_pylist() == ["No comments", "10 pages"]
+    assert exporter.partition_path("2024-07").stat().st_mtime_ns == untouched
+
+
+def test_rerun_removes_missing_month(exporter):
+    exporter.export()
+    with exporter.paper_db._transaction():
+        exporter.paper_db.conn.execute("DELETE FROM papers WHERE first_announced_date < '2024-08-01'")
+    assert exporter.export() == {}
+    assert not (exporter.output_dir / "month=2024-07").exists()
+    assert read_snapshot(exporter.output_dir).num_rows == 4
+
+
+def test_read_snapshot_projects_columns_and_months(exporter):
+    exporter.export()
+    table = read_snapshot(exporter.output_dir, months=["2024-09", "2025-01"], columns=["url", "categories"])
+    assert table.schema == pa.schema([SCHEMA.field("url"), SCHEMA.field("categories")])
+    assert table.column("url").to_pylist() == [make_papers()[4].url, make_papers()[5].url]
+    empty = read_snapshot(exporter.output_dir, months=["2025-01"], columns=["url"])
+    assert empty.num_rows == 0 and empty.schema.names == ["url"]
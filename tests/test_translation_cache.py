@@ -0,0 +1,56 @@
+import sqlite3
+
+import translation_cache
+from translation_cache import TranslationCache, default_cache, set_default_cache, set_default_cache_path
+
+
+def last_used(path, cache):
+    conn = sqlite3.connect(path)
+    (value,) = conn.execute(
+        "SELECT last_used FROM translations WHERE text_hash = ?", (cache.key("word", "en", "zh", "google")[0],)
+    ).fetchone()
+    conn.close()
+    return value
+
+
+def test_disk_hits_touch_last_used_in_batches(tmp_path):
+    path = str(tmp_path / "translation_cache.db")
+    cache = TranslationCache(path)
+    cache.put("word", "en", "zh", "google", "词")
+    cache.close()
+
+    cache = TranslationCache(path)
+    stored = last_used(path, cache)
+    assert cache.get("word", "en", "zh", "google") == "词"
+    assert cache.stats()["disk_hits"] == 1
+    # 命中只记录在内存中, 下一次写入时一起写回
+    assert last_used(path, cache) == stored
+    cache.put("other", "en", "zh", "google", "其他")
+    assert last_used(path, cache) > stored
+    cache.close()
+
+
+def test_close_flushes_touches(tmp_path):
+    path = str(tmp_path / "translation_cache.db")
+    cache = TranslationCache(path)
+    cache.put("word", "en", "zh", "google", "词")
+    cache.close()
+
+    cache = TranslationCache(path)
+    stored = last_used(path, cache)
+    cache.get("word", "en", "zh", "google")
+    cache.close()
+    assert last_used(path, cache) > stored
+
+
+def test_default_cache_path_is_configurable(tmp_path, monkeypatch):
+    monkeypatch.setattr(translation_cache, "_default_cache_path", translation_cache._default_cache_path)
+    set_default_cache(None)
+    set_default_cache_path(str(tmp_path / "data" / "translation_cache.db"))
+    (tmp_path / "data").mkdir()
+    cache = default_cache()
+    try:
+        assert (tmp_path / "data" / "translation_cache.db").exists()
+    finally:
+        set_default_cache(None)
+        cache.close()
@@ -0,0 +1,207 @@
+import asyncio
+import atexit
+import hashlib
+import sqlite3
+import threading
+import time
+
+from collections import OrderedDict
+
+
+class TranslationCache:
+    """
+    两级翻译缓存: 进程内的LRU在前, SQLite持久化存储在后, 以(原文摘要, 源语言, 目标语言, 翻译后端)为键。
+
+    - 内存层最多保存`max_memory_items`条, 按最近使用淘汰
+    - 磁盘层最多保存`max_entries`条, 超出时按最近使用时间删除到90%
+    - 磁盘命中时的最近使用时间先记录在内存中, 写入、淘汰、关闭或积累到`touch_batch_size`条时再批量写回
+    - `stats`给出各层的命中数和未命中数
+    可以在多个线程中使用
+    """
+
+    def __init__(self, db_path="translation_cache.db", max_memory_items=4096, max_entries=1_000_000, touch_batch_size=1000):
+        """
+        Args:
+            db_path (str, optional): 缓存数据库路径. Defaults to "translation_cache.db".
+            max_memory_items (int, optional): 内存LRU的容量. Defaults to 4096.
+            max_entries (int, optional): 磁盘缓存的容量. Defaults to 1_000_000.
+            touch_batch_size (int, optional): 缓冲的最近使用时间达到该条数时写回数据库. Defaults to 1000.
+        """
+        self.max_memory_items = max_memory_items
+        self.max_entries = max_entries
+        self.touch_batch_size = touch_batch_size
+        self.memory: OrderedDict[tuple, str] = OrderedDict()
+        # 磁盘命中但尚未写回的最近使用时间
+        self._touched: dict[tuple, float] = {}
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA synchronous = NORMAL")
+        with self.conn:
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS translations (
+                    text_hash TEXT NOT NULL,
+                    langfrom TEXT NOT NULL,
+                    langto TEXT NOT NULL,
+                    backend TEXT NOT NULL,
+                    result TEXT NOT NULL,
+                    last_used REAL NOT NULL,
+                    PRIMARY KEY (text_hash, langfrom, langto, backend)
+                ) WITHOUT ROWID
+                """
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_translations_last_used ON translations (last_used)")
+        self.entries = self.conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+
+    @staticmethod
+    def key(text: str, langfrom: str, langto: str, backend: str) -> tuple[str, str, str, str]:
+        return hashlib.blake2b(text.encode(), digest_size=16).hexdigest(), langfrom, langto, backend
+
+    def _get_memory(self, key) -> str | None:
+        with self._lock:
+            result = self.memory.get(key)
+            if result is not None:
+                self.memory.move_to_end(key)
+                self.memory_hits += 1
+            return result
+
+    def _remember(self, key, result: str):
+        self.memory[key] = result
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_memory_items:
+            self.memory.popitem(last=False)
+
+    def _get_disk(self, key) -> str | None:
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT result FROM translations WHERE text_hash = ? AND langfrom = ? AND langto = ? AND backend = ?",
+                key,
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._touched[key] = time.time()
+            if len(self._touched) >= self.touch_batch_size:
+                with self.conn:
+                    self._flush_touched()
+            self.disk_hits += 1
+            self._remember(key, row[0])
+            return row[0]
+
+    def get(self, text: str, langfrom: str, langto: str, backend: str) -> str | None:
+        """
+        查询缓存的译文, 未命中时返回None
+        """
+        key = self.key(text, langfrom, langto, backend)
+        result = self._get_memory(key)
+        return result if result is not None else self._get_disk(key)
+
+    def put(self, text: str, langfrom: str, langto: str, backend: str, result: str):
+        key = self.key(text, langfrom, langto, backend)
+        with self._lock:
+            self._remember(key, result)
+            with self.conn:
+                self._flush_touched()
+                cursor = self.conn.execute(
+                    "INSERT OR IGNORE INTO translations "
+                    "(text_hash, langfrom, langto, backend, result, last_used) VALUES (?, ?, ?, ?, ?, ?)",
+                    (*key, result, time.time()),
+                )
+            self.entries += cursor.rowcount
+            if self.entries > self.max_entries:
+                self._evict()
+
+    def _flush_touched(self):
+        """
+        把缓冲的最近使用时间写回数据库, 需要持有锁并在事务中调用
+        """
+        if self._touched:
+            self.conn.executemany(
+                "UPDATE translations SET last_used = ? "
+                "WHERE text_hash = ? AND langfrom = ? AND langto = ? AND backend = ?",
+                ((last_used, *key) for key, last_used in self._touched.items()),
+            )
+            self._touched.clear()
+
+    def flush(self):
+        """
+        立即写回缓冲的最近使用时间
+        """
+        with self._lock, self.conn:
+            self._flush_touched()
+
+    def _evict(self):
+        """
+        按最近使用时间删除最旧的条目, 直到不超过`max_entries`的90%
+        """
+        with self.conn:
+            self._flush_touched()
+            self.conn.execute(
+                """
+                DELETE FROM translations WHERE last_used <= (
+                    SELECT last_used FROM translations ORDER BY last_used LIMIT 1 OFFSET ?
+                )
+                """,
+                (self.entries - int(self.max_entries * 0.9) - 1,),
+            )
+        self.entries = self.conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+
+    async def aget(self, text: str, langfrom: str, langto: str, backend: str) -> str | None:
+        """
+        (aio)`get`的异步版本, 内存未命中时在线程中查询磁盘, 不阻塞事件循环
+        """
+        key = self.key(text, langfrom, langto, backend)
+        result = self._get_memory(key)
+        return result if result is not None else await asyncio.to_thread(self._get_disk, key)
+
+    async def aput(self, text: str, langfrom: str, langto: str, backend: str, result: str):
+        await asyncio.to_thread(self.put, text, langfrom, langto, backend, result)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "memory_items": len(self.memory),
+            "entries": self.entries,
+        }
+
+    def close(self):
+        with self._lock:
+            if self._touched:
+                with self.conn:
+                    self._flush_touched()
+            self.conn.close()
+
+
+_default_cache: TranslationCache | None = None
+_default_cache_path = "translation_cache.db"
+
+
+def default_cache() -> TranslationCache:
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = TranslationCache(_default_cache_path)
+        # 进程退出前写回缓冲的最近使用时间
+        atexit.register(_default_cache.close)
+    return _default_cache
+
+
+def set_default_cache_path(path: str):
+    """
+    设置默认缓存的数据库路径, 在下次创建默认缓存时生效(通常放在papers.db旁边)
+    """
+    global _default_cache_path
+    _default_cache_path = path
+
+
+def set_default_cache(cache: TranslationCache | None):
+    """
+    替换`async_translate`和`translate`使用的默认缓存, 例如使用其他路径的缓存数据库; None表示下次使用时重新创建默认缓存
+    """
+    global _default_cache
+    _default_cache = cache